@@ -0,0 +1,60 @@
+"""
+Compares repairing a CongestionField after the mobs move with rebuilding it from scratch.
+
+Every frame some of the mobs take a step along the field toward the player, and the field either repairs the cells
+around the changed occupancy or is rebuilt.
+
+Run with `uv run python -m benchmarks.congestion_field`.
+"""
+
+import argparse
+import random
+import time
+
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.congestion_field import CongestionField
+from cellcrawler.maze.random_rooms_level_factory import RandomRoomsLevelFactory
+
+
+def run(maze: MazeData, mobs: int, movers: int, frames: int, rebuild: bool) -> float:
+    random.seed(0)
+    maze.occupancy.fill(0)
+    player = maze.free_cells.choice()
+    cells = random.sample(list(maze.free_cells), mobs)
+    for cell in cells:
+        maze.set_occupied(maze.cell_pos(cell))
+    field = CongestionField(maze, [player])
+    elapsed = 0.0
+    for _ in range(frames):
+        for i in random.sample(range(mobs), movers):
+            cell = cells[i]
+            if (step := field.step_toward(cell)) >= 0 and step != player:
+                maze.move_occupied(maze.cell_pos(cell), maze.cell_pos(step))
+                cells[i] = step
+        start = time.perf_counter()
+        if rebuild:
+            field = CongestionField(maze, [player])
+        else:
+            field.refresh()
+        elapsed += time.perf_counter() - start
+    return elapsed / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100, help="RandomRoomsLevelFactory size, the floor is 2*size+1")
+    parser.add_argument("--mobs", type=int, default=300)
+    parser.add_argument("--movers", type=int, default=30, help="mobs that take a step every frame")
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+
+    maze = RandomRoomsLevelFactory(args.size, 2, 8, args.size * 20)._make_level()  # pyright: ignore[reportPrivateUsage]
+    maze.build_adjacency()
+    print(f"floor {maze.width}x{maze.height}, {len(maze.free_cells)} open cells, {args.mobs} mobs, {args.movers} move")
+    for rebuild in (True, False):
+        mode = "rebuild" if rebuild else "repair"
+        print(f"{mode:>7}: {run(maze, args.mobs, args.movers, args.frames, rebuild) * 1000:7.2f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares the Manhattan and the landmark (ALT) heuristics of A* and Jump Point Search on a RandomDfsLevelFactory maze,
+where the shortest paths twist around and the Manhattan distance is a loose bound.
+
+Prints the landmark build time and memory, then the mean time and expanded nodes per query for every search.
+
+Run with `uv run python -m benchmarks.landmarks`.
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.landmarks import Landmarks, landmark_fields
+from cellcrawler.maze.pathfinding.point_search import Heuristic, PathResult, astar, jump_point_search
+from cellcrawler.maze.random_dfs_level_factory import RandomDfsLevelFactory
+
+type Query = tuple[tuple[int, int], tuple[int, int]]
+type Search = Callable[[MazeData, tuple[int, int], tuple[int, int], Heuristic | None], PathResult]
+
+
+def run(maze: MazeData, search: Search, heuristic: Heuristic | None, queries: list[Query]) -> tuple[float, float]:
+    expanded = 0
+    start = time.perf_counter()
+    for a, b in queries:
+        expanded += search(maze, a, b, heuristic).expanded
+    return (time.perf_counter() - start) / len(queries), expanded / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100, help="RandomDfsLevelFactory size, the floor is 2*size+1")
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    maze = RandomDfsLevelFactory(args.size)._make_level()  # pyright: ignore[reportPrivateUsage]
+    maze.build_adjacency()
+    start = time.perf_counter()
+    maze.set_landmark_fields(landmark_fields(maze, args.landmarks))
+    elapsed = time.perf_counter() - start
+    landmarks = Landmarks(maze)
+    print(f"floor {maze.width}x{maze.height}, {len(maze.free_cells)} open cells")
+    print(f"{len(landmarks)} landmarks: built in {elapsed * 1000:.1f} ms, {landmarks.nbytes / 1024:.0f} KiB")
+
+    cells = list(maze.free_cells)
+    queries = [(maze.cell_pos(random.choice(cells)), maze.cell_pos(random.choice(cells))) for _ in range(args.queries)]
+    for name, search in (("A*", astar), ("JPS", jump_point_search)):
+        for heuristic_name, heuristic in (("manhattan", None), ("landmarks", landmarks.heuristic)):
+            per_query, expanded = run(maze, search, heuristic, queries)
+            print(f"{name:>4} {heuristic_name:>9}: {per_query * 1000:7.2f} ms, {expanded:9.0f} expanded per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures Node.calculate of a MathTarget with many registered modifiers, such as CharacterSpeed, which is evaluated
+for every moving character in every frame.
+
+With --churn, one modifier is removed and another is added every that many calls, which invalidates the chain.
+With --scoped, every modifier is bound to a character of its own, as the effects of the items are, and is skipped
+when the speed of another character is calculated. With --no-memoize, CharacterSpeed is not memoized.
+
+Run with `uv run python -m benchmarks.math_targets`.
+"""
+
+import argparse
+import time
+
+from cellcrawler.core.roguelike_calc_tree import CharacterNode, CharacterSpeed, GameNode, LevelTree
+
+
+def add_modifier(tree: LevelTree, priority: int, scoped: bool) -> GameNode[LevelTree]:
+    node = GameNode[LevelTree](tree)
+    subject = CharacterNode(tree) if scoped else None
+    node.add_math_target(CharacterSpeed, lambda speed, _character: speed * 1.0001, priority, subject)
+    return node
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modifiers", type=int, default=1000)
+    parser.add_argument("--priorities", type=int, default=16, help="distinct priorities of the modifiers")
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--churn", type=int, default=0, help="replace a modifier every this many calls, 0 for never")
+    parser.add_argument("--scoped", action="store_true", help="bind every modifier to another character")
+    parser.add_argument("--memoize", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args()
+    CharacterSpeed.memoize = args.memoize
+
+    tree = LevelTree()
+    character = CharacterNode(tree)
+    modifiers = [add_modifier(tree, i % args.priorities, args.scoped) for i in range(args.modifiers)]
+    start = time.perf_counter()
+    for call in range(args.calls):
+        if args.churn and call % args.churn == 0:
+            modifiers.pop(0).destroy()
+            modifiers.append(add_modifier(tree, call % args.priorities, args.scoped))
+        character.calculate(CharacterSpeed, 1.0, character)
+    elapsed = time.perf_counter() - start
+    scope = "scoped" if args.scoped else "global"
+    print(f"{args.modifiers} {scope} modifiers, {args.priorities} priorities, churn every {args.churn or '-'} calls")
+    print(f"calculate: {elapsed / args.calls * 1e6:8.2f} us per call")
+    if args.memoize:
+        stats = tree.listener.memo_stats[CharacterSpeed]
+        print(f"memo: {stats.hits} hits, {stats.misses} misses, {stats.hit_rate:.1%} hit rate")
+
+
+if __name__ == "__main__":
+    main()
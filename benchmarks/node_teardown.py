@@ -0,0 +1,58 @@
+"""
+Measures destroying many characters that carry effect nodes bound to them by a ParentRemovalBinder, as a level
+teardown does.
+
+With --broadcast, the binders wait for NodeDestroyed and compare the ids themselves, as they used to, so that
+every destroyed node wakes up every binder.
+
+Run with `uv run python -m benchmarks.node_teardown`.
+"""
+
+import argparse
+import time
+from typing import Any, final
+
+from cellcrawler.core.roguelike_calc_tree import CharacterNode, GameNode, LevelTree
+from cellcrawler.lib.calculation_tree import Node, NodeDestroyed, NodeIdT, ParentRemovalBinder
+
+
+@final
+class BroadcastBinder(GameNode[GameNode[Any]]):
+    def __init__(self, parent: GameNode[Any], oid: NodeIdT):
+        super().__init__(parent)
+        self.uuid = oid
+        self.accept(NodeDestroyed, self.check_destroyed)
+
+    def check_destroyed(self, oid: NodeIdT):
+        if oid == self.uuid:
+            self.parent.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--characters", type=int, default=2000)
+    parser.add_argument("--broadcast", action="store_true", help="bind the effects through NodeDestroyed")
+    args = parser.parse_args()
+
+    tree = LevelTree()
+    characters: list[Node[Any, Any]] = []
+    for _ in range(args.characters):
+        character = CharacterNode(tree)
+        # The effect lives elsewhere in the tree and goes away together with the character
+        effect = GameNode[LevelTree](tree)
+        if args.broadcast:
+            BroadcastBinder(effect, character.name)
+        else:
+            ParentRemovalBinder(effect, character.name)
+        characters.append(character)
+    start = time.perf_counter()
+    for character in characters:
+        character.destroy()
+    elapsed = time.perf_counter() - start
+    assert not tree._children  # noqa: S101  # pyright: ignore[reportPrivateUsage]
+    mode = "broadcast" if args.broadcast else "indexed"
+    print(f"{args.characters} characters with an effect, {mode}: {elapsed * 1000:8.1f} ms to destroy them")
+
+
+if __name__ == "__main__":
+    main()
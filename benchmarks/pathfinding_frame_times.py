@@ -0,0 +1,90 @@
+"""
+Compares frame times of the main-thread and the background-thread player pathfinding.
+
+Simulates the game loop without a window: every frame does some fixed main-thread work, the player walks
+to an adjacent cell every few frames, and the pathfinder is flushed and advanced as RepeatedPathfinder does.
+
+Run with `uv run python -m benchmarks.pathfinding_frame_times`.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections.abc import Callable
+from typing import Self, final
+
+from cellcrawler.lib.base import DependencyInjector
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.character_pathfinding import CharacterPathfinding
+from cellcrawler.maze.pathfinding.pathfinding_scheduler import PathfindingScheduler
+from cellcrawler.maze.random_rooms_level_factory import RandomRoomsLevelFactory
+
+
+@final
+class WalkingPlayer:
+    def __init__(self, maze: MazeData):
+        self.maze = maze
+        self.cell = maze.free_cells.choice()
+        self.callbacks: list[Callable[[Self], None]] = []
+
+    def get_cell_pos(self) -> tuple[int, int]:
+        return self.maze.cell_pos(self.cell)
+
+    def run_on_cell_change(self, func: Callable[[Self], None], /) -> None:
+        self.callbacks.append(func)
+
+    def step(self):
+        self.cell = random.choice(self.maze.adjacency.neighbours(self.cell))
+        for callback in self.callbacks:
+            callback(self)
+
+
+def busy_wait(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run(maze: MazeData, background: bool, frames: int, step_every: int, frame_work: float) -> list[float]:
+    random.seed(0)
+    player = WalkingPlayer(maze)
+    pathfinder = CharacterPathfinding(player, background=background)
+    scheduler = PathfindingScheduler(pathfinder.update)
+    pathfinder.scheduler = scheduler
+    pathfinder.run()
+
+    times: list[float] = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        busy_wait(frame_work)
+        if frame % step_every == 0:
+            player.step()
+        scheduler.flush()
+        pathfinder.advance()
+        times.append(time.perf_counter() - start)
+    pathfinder.close()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=250, help="RandomRoomsLevelFactory size, the floor is 2*size+1")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--step-every", type=int, default=10, help="frames between two player steps")
+    parser.add_argument("--frame-work-ms", type=float, default=4, help="simulated main-thread work per frame")
+    args = parser.parse_args()
+
+    maze = RandomRoomsLevelFactory(args.size, 2, 8, args.size * 20)._make_level()  # pyright: ignore[reportPrivateUsage]
+    maze.build_adjacency()
+    DependencyInjector.set_maze(maze)
+    print(f"floor {maze.width}x{maze.height}, {len(maze.free_cells)} open cells")
+    for background in (False, True):
+        times = sorted(run(maze, background, args.frames, args.step_every, args.frame_work_ms / 1000))
+        mean, p95, worst = (t * 1000 for t in (statistics.mean(times), times[int(len(times) * 0.95)], times[-1]))
+        mode = "worker thread" if background else "main thread"
+        print(f"{mode:>13}: mean {mean:6.2f} ms, p95 {p95:6.2f} ms, max {worst:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures Node.dispatch of a trigger with many subscribers while they come and go, as effects do on a busy level.
+
+Every --churn dispatches, one subscriber is destroyed and another one is added with a random priority,
+often a new one. The priorities are spread over --priorities values.
+
+Run with `uv run python -m benchmarks.trigger_dispatch`.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from cellcrawler.core.roguelike_calc_tree import GameNode, LevelTree
+from cellcrawler.lib.calculation_tree import Trigger
+
+Hit = Trigger[int]("Hit")
+
+
+def subscribe(tree: LevelTree, priorities: int) -> GameNode[LevelTree]:
+    node = GameNode[LevelTree](tree)
+    node.accept(Hit, lambda _damage: None, random.randrange(priorities))
+    return node
+
+
+def run(tree: LevelTree, nodes: list[GameNode[LevelTree]], dispatches: int, churn: int, priorities: int) -> float:
+    start = time.perf_counter()
+    for i in range(dispatches):
+        if churn and i % churn == 0:
+            nodes.pop(random.randrange(len(nodes))).destroy()
+            nodes.append(subscribe(tree, priorities))
+        tree.dispatch(Hit, i)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--priorities", type=int, default=1000)
+    parser.add_argument("--dispatches", type=int, default=20000)
+    parser.add_argument("--churn", type=int, default=2, help="replace a subscriber every this many dispatches")
+    args = parser.parse_args()
+
+    random.seed(0)
+    tree = LevelTree()
+    nodes = [subscribe(tree, args.priorities) for _ in range(args.subscribers)]
+    print(f"{args.subscribers} subscribers over {args.priorities} priorities")
+    elapsed = run(tree, nodes, args.dispatches, args.churn, args.priorities)
+    print(f"churn every {args.churn}: {elapsed / args.dispatches * 1e6:8.2f} us per dispatch")
+    elapsed = run(tree, nodes, args.dispatches, 0, args.priorities)
+    print(f"   no churn: {elapsed / args.dispatches * 1e6:8.2f} us per dispatch")
+
+    tracemalloc.start()
+    tree.dispatch(Hit, 0)
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    tree.dispatch(Hit, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak memory allocated by a dispatch: {peak - before} bytes")
+
+
+if __name__ == "__main__":
+    main()
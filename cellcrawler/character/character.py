@@ -51,7 +51,7 @@ class AttackContext:
     damage: int
 
 
-AttackHappened = Trigger[AttackContext]("AttackHappened")
+AttackHappened = Trigger[AttackContext]("AttackHappened", subject=lambda ctx: ctx.attacker.calc_node)
 
 
 class CommandType(Enum):
@@ -144,10 +144,8 @@ class Character(ManagedNodePath, Generic[CalcNodeT], abc.ABC):
         new_position = self.get_cell_pos()
         if new_position != self.__prev_position:
             maze = DependencyInjector.get(MazeData)
-            if self.__prev_position != (-1, -1):
-                maze.clear_occupied(self.__prev_position)
+            maze.move_occupied(self.__prev_position if self.__prev_position != (-1, -1) else None, new_position)
             self.__prev_position = new_position
-            maze.set_occupied(new_position)
             for cmd in self.__on_cell_change:
                 cmd(self)
 
@@ -7,6 +7,7 @@ from cellcrawler.character.commands import ProceduralMovement, WrapInAttack
 from cellcrawler.core.roguelike_calc_tree import CharacterNode, MobNextCell, NextCellContext
 from cellcrawler.lib.base import DependencyInjector
 from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.pathfinding import PathfindingService
 
 type CellPos = tuple[int, int]
 
@@ -73,45 +74,35 @@ class StandStillStrategy(MobMovementStrategy):
 @final
 class AfterBarStrategy(MobMovementStrategy):
     AFK_CHANCE = 0  # 0.15
-    current_move: None | tuple[int, int] = None
+    # Difference between cell ids of the next and the current cell
+    current_move: None | int = None
 
     @override
     def next_cell(self, current_cell: CellPos, maze: MazeData) -> CellPos | None:
-        x, y = current_cell
-        options = maze.get_adjacent(x, y)
-        if self.current_move and (same_direction := add_pos(current_cell, self.current_move)) in options:
-            return same_direction
+        if not maze.in_bounds(*current_cell):
+            return None
+        cell = maze.cell_id(*current_cell)
+        options = maze.adjacency.neighbours(cell)
+        if self.current_move and (same_direction := cell + self.current_move) in options:
+            return maze.cell_pos(same_direction)
         if options and random.random() < 1 - self.AFK_CHANCE:
             if len(options) > 1 and self.current_move:
                 # Attempt not to go back and forth repeatedly
-                options = [x for x in options if x != sub_pos((0, 0), self.current_move)]
+                options = [x for x in options if x != cell - self.current_move]
             move = random.choice(options)
-            self.current_move = sub_pos(move, current_cell)
-            return move
+            self.current_move = move - cell
+            return maze.cell_pos(move)
         self.current_move = None
         return None
 
 
 @final
 class FearStrategy(MobMovementStrategy):
-    AFK_CHANCE = 0  # 0.15
-    current_move: None | tuple[int, int] = None
+    """Runs from the player along the safety map of the player field, see PathfindingService.get_step_flee."""
 
     @override
     def next_cell(self, current_cell: CellPos, maze: MazeData) -> CellPos | None:
-        x, y = current_cell
-        options = maze.get_adjacent(x, y)
-        if self.current_move and (same_direction := add_pos(current_cell, self.current_move)) in options:
-            return same_direction
-        if options and random.random() < 1 - self.AFK_CHANCE:
-            if len(options) > 1 and self.current_move:
-                # Attempt not to go back and forth repeatedly
-                options = [x for x in options if x != sub_pos((0, 0), self.current_move)]
-            move = random.choice(options)
-            self.current_move = sub_pos(move, current_cell)
-            return move
-        self.current_move = None
-        return None
+        return DependencyInjector.get(PathfindingService).get_step_flee(*current_cell)
 
 
 @final
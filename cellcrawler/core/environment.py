@@ -11,16 +11,15 @@ from cellcrawler.lib.base import DependencyInjector, RootNodes, inject_globals
 from cellcrawler.lib.managed_node import ManagedNode, ManagedNodePath
 from cellcrawler.maze.block_factory import BlockFactory
 from cellcrawler.maze.blockpos_utils import MAZE_SCALE, maze_to_world_position
-from cellcrawler.maze.maze_data import MazeCell, MazeData
+from cellcrawler.maze.maze_data import MazeData
 
 
 @final
 class Environment(ManagedNodePath):
     def __init__(self, parent: ManagedNode, level_tree: LevelTree, maze: MazeData) -> None:
         self.maze = maze
-        self.open_positions = [
-            (x, y) for x in range(maze.width) for y in range(maze.height) if maze.cells[y][x] == MazeCell.OPEN
-        ]
+        open_xs, open_ys = maze.walkable.T.nonzero()
+        self.open_positions = list(zip(open_xs.tolist(), open_ys.tolist(), strict=True))
         super().__init__(parent)
         self.mob_count = 0
         self.calc_node = GameNode(level_tree)
@@ -43,10 +43,10 @@ class DamageContext:
     damage: int
 
 
-CharacterSpeed = MathTarget[float, CharacterNode]("CharacterSpeed")
-MobNextCell = MathTarget[tuple[int, int] | None, NextCellContext]("MobNextCell")
-MaxHealth = MathTarget[int, CharacterNode]("MaxHealth")
+CharacterSpeed = MathTarget[float, CharacterNode]("CharacterSpeed", subject=lambda character: character, memoize=True)
+MobNextCell = MathTarget[tuple[int, int] | None, NextCellContext]("MobNextCell", subject=lambda ctx: ctx.mob)
+MaxHealth = MathTarget[int, CharacterNode]("MaxHealth", subject=lambda character: character, memoize=True)
 Damage = MathTarget[int, DamageContext]("Damage")
-DamageDealt = Trigger[DamageContext]("DamageDealt")
+DamageDealt = Trigger[DamageContext]("DamageDealt", subject=lambda ctx: ctx.attacker)
 MobDied = Trigger[()]("MobDied")
 PlayerDied = Trigger[()]("PlayerDied")
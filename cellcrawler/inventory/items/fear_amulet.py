@@ -27,10 +27,7 @@ class FearAmulet(InventoryItem):
         def recalc_next_cell(value: tuple[int, int] | None, ctx: NextCellContext):
             distance_to_player = parent.pathfinding.get_distance(*ctx.start_pos)
             if distance_to_player is not None and distance_to_player <= self.MAX_FEAR_DISTANCE:
-                adjacent_cells = parent.pathfinding.get_distances_to_adjacent(*ctx.start_pos)
-                if not adjacent_cells or max(adjacent_cells)[0] < distance_to_player:
-                    return None
-                return max(adjacent_cells)[1]
+                return parent.pathfinding.get_step_flee(*ctx.start_pos)
             return value
 
         node.add_math_target(MobNextCell, recalc_next_cell)
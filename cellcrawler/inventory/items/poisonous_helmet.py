@@ -23,11 +23,9 @@ def make_timed(node: GameNode[Any], dur: float) -> None:
 class SpreadableEffect(GameNode[CharacterNode], abc.ABC):
     def __init__(self, parent: CharacterNode):
         super().__init__(parent)
-        self.accept(AttackHappened, self.do_clone)
+        self.accept(AttackHappened, self.do_clone, subject=parent)
 
     def do_clone(self, ctx: AttackContext):
-        if ctx.attacker.calc_node is not self.parent:
-            return
         # Prototype pattern.
         self.clone(ctx.defender)
 
@@ -74,8 +72,7 @@ class PoisonousHelmet(InventoryItem):
         node = GameNode(parent)
 
         def stun(ctx: AttackContext):
-            if ctx.attacker.calc_node is parent:
-                Poison(ctx.defender, 6.0, 3)
+            Poison(ctx.defender, 6.0, 3)
 
-        node.accept(AttackHappened, stun)
+        node.accept(AttackHappened, stun, subject=parent)
         return node
@@ -22,10 +22,8 @@ class SpeedAmulet(InventoryItem):
     def make_equipment(self, parent: PlayerNode) -> GameNode[PlayerNode]:
         node = GameNode(parent)
 
-        def recalc_speed(value: float, character: CharacterNode):
-            if character is node.parent:
-                value *= 1.5
-            return value
+        def recalc_speed(value: float, _character: CharacterNode):
+            return value * 1.5
 
-        node.add_math_target(CharacterSpeed, recalc_speed)
+        node.add_math_target(CharacterSpeed, recalc_speed, subject=parent)
         return node
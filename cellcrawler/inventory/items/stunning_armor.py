@@ -26,12 +26,10 @@ def make_timed(node: GameNode[Any], dur: float) -> None:
 class Stun(GameNode[CharacterNode]):
     def __init__(self, parent: CharacterNode, duration: float):
         super().__init__(parent)
-        self.add_math_target(MobNextCell, self.get_next_cell)
+        self.add_math_target(MobNextCell, self.get_next_cell, subject=parent)
         make_timed(self, duration)
 
-    def get_next_cell(self, value: tuple[int, int] | None, ctx: NextCellContext):
-        if ctx.mob is not self.parent:
-            return value
+    def get_next_cell(self, _value: tuple[int, int] | None, ctx: NextCellContext):
         return ctx.start_pos
 
 
@@ -51,8 +49,7 @@ class StunningArmor(InventoryItem):
         node = GameNode(parent)
 
         def stun(ctx: DamageContext):
-            if ctx.attacker is parent:
-                Stun(ctx.target, ctx.damage / 20)
+            Stun(ctx.target, ctx.damage / 20)
 
-        node.accept(DamageDealt, stun)
+        node.accept(DamageDealt, stun, subject=parent)
         return node
@@ -7,7 +7,15 @@ from direct.showbase.Loader import Loader
 from direct.showbase.ShowBase import ShowBase
 from direct.stdpy import file
 from direct.task.Task import TaskManager
-from panda3d.core import Camera, ClockObject, CollisionTraverser, NodePath, VirtualFileSystem, load_prc_file_data
+from panda3d.core import (
+    Camera,
+    ClockObject,
+    CollisionTraverser,
+    NodePath,
+    SubfileInfo,
+    VirtualFileSystem,
+    load_prc_file_data,
+)
 from rich.traceback import install
 
 from cellcrawler.core.roguelike_calc_tree import LevelTree
@@ -51,6 +59,14 @@ class FileLoader:
         with file.open(path_filename, mode) as f:
             return f.read()
 
+    def system_path(self, path: str) -> str | None:
+        """The path of a file on the disk, None if it is not stored as a plain file (e.g. it is in a multifile)."""
+        vfile = self.__vfs.get_file("/" + path)
+        info = SubfileInfo()
+        if not vfile or not vfile.get_system_info(info) or info.get_start() != 0:
+            return None
+        return info.get_filename().to_os_specific()
+
 
 @dataclasses.dataclass
 class RootNodes:
@@ -1,7 +1,11 @@
 # Copied almost verbatim from another project I work on. Otherwise I would rewrite it basically the same way.
 
+from bisect import bisect_left
 from collections import defaultdict
 from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import chain
+from operator import itemgetter
 from typing import Any, ClassVar, Generic, Self, TypeVarTuple, cast, final, override
 
 from typing_extensions import TypeVar
@@ -24,9 +28,14 @@ NodeIdT = int
 MathPriority = int
 TriggerPriority = int
 
-# Internal type to be stored in the ListenerController.
-NodeDictEvent = dict[TriggerPriority, dict["Node[Any, R]", Callable[[*E], None]]]
-NodeDictMath = dict[MathPriority, dict["Node[Any, R]", Callable[[T, C], T]]]
+# The node that an event is about, such as the character that moves. None stands for every subject.
+type Subject = Node[Any, Any] | None
+
+# Internal types to be stored in the ListenerController.
+# The listeners of one priority, by node.
+type Bucket[V] = dict[Node[Any, Any], V]
+# A bucket with a snapshot of its listeners in the order they run.
+type Layer[V] = tuple[Bucket[V], tuple[tuple[Node[Any, Any], V], ...]]
 
 
 class Trigger(Generic[*E]):
@@ -37,11 +46,16 @@ class Trigger(Generic[*E]):
     This is deliberately a class with a generic parameter that is left unused.
     Instances of this class should be created as `Trigger[int, bool]()` etc.
     This is used to make sure that different triggers have correct typechecking of their functions.
+
+    A trigger with a `subject` function can also be accepted for a single subject node, see Node.accept.
     """
 
-    def __init__(self, name: str, debug: bool = False):
+    def __init__(self, name: str, debug: bool = False, subject: "Callable[[*E], Node[Any, Any]] | None" = None):
         self.name: str = name
         self.debug: bool = debug
+        self.subject: Callable[[*E], Node[Any, Any]] | None = subject
+        # Whether is_valid is worth calling after every listener
+        self.validates: bool = type(self).is_valid is not Trigger.is_valid  # pyright: ignore[reportUnknownMemberType]
 
     def is_valid(self, *_params: *E) -> bool:
         return True
@@ -59,15 +73,29 @@ class MathTarget(Generic[T, C]):
     This is deliberately a class with a generic parameter that is left unused.
     Instances of this class should be created as `MathTarget[int, Context]()` etc.
     This is used to make sure that different triggers have correct typechecking of their functions.
+
+    A math target with a `subject` function can also be modified for a single subject node, see Node.add_math_target.
+
+    A `memoize`d math target remembers the last value calculated for every context object, until a callback
+    of the target is added or removed. Only targets whose value depends on nothing but the identity of the context
+    and the initial value may be memoized, and their initial values must be comparable.
     """
 
-    def __init__(self, name: str, debug: bool = False):
+    def __init__(
+        self,
+        name: str,
+        debug: bool = False,
+        subject: "Callable[[C], Node[Any, Any]] | None" = None,
+        memoize: bool = False,
+    ):
         self.name: str = name
         self.debug: bool = debug
+        self.subject: Callable[[C], Node[Any, Any]] | None = subject
+        self.memoize: bool = memoize
 
 
 NodeDestroyed = Trigger[NodeIdT]("NodeDestroyed")
-"""Fired right before an object in the tree is destroyed."""
+"""Fired right before an object in the tree is destroyed. To wait for a single node, use Node.on_destroyed."""
 
 
 class Node(Generic[P_co, R]):
@@ -100,6 +128,7 @@ class Node(Generic[P_co, R]):
         if self.destroyed:
             return
         self.dispatch(NodeDestroyed, self._name)
+        self.root.listener.run_destroyed(self._name)
         self.root.listener.remove(self)
         for child in list(self._children.values()):
             child.destroy()
@@ -118,11 +147,32 @@ class Node(Generic[P_co, R]):
     def name(self):
         return self._name
 
-    def accept(self, event: Trigger[*E], func: Callable[[*E], None], priority: TriggerPriority = 0):
-        self.root.listener.add_trigger(self, event, func, priority)
+    def accept(
+        self,
+        event: Trigger[*E],
+        func: Callable[[*E], None],
+        priority: TriggerPriority = 0,
+        subject: "Node[Any, R] | None" = None,
+    ):
+        """With a `subject`, `func` is only called for the events about that node, see Trigger.subject."""
+        self.root.listener.add_trigger(self, event, func, priority, subject)
 
-    def add_math_target(self, event: MathTarget[T, C], func: Callable[[T, C], T], priority: MathPriority = 0):
-        self.root.listener.add_math_target(self, event, func, priority)
+    def add_math_target(
+        self,
+        event: MathTarget[T, C],
+        func: Callable[[T, C], T],
+        priority: MathPriority = 0,
+        subject: "Node[Any, R] | None" = None,
+    ):
+        """With a `subject`, `func` only modifies the values about that node, see MathTarget.subject."""
+        self.root.listener.add_math_target(self, event, func, priority, subject)
+
+    def on_destroyed(self, oid: NodeIdT, func: Callable[[NodeIdT], None]):
+        """
+        Calls `func` right before the node `oid` is destroyed. Unlike NodeDestroyed, only the nodes waiting for
+        that node are called, so tearing down many nodes doesn't wake up every waiting node every time.
+        """
+        self.root.listener.add_destroyed(self, oid, func)
 
     def dispatch(self, event: Trigger[*E], *data: *E):
         self.root.listener.run_trigger(event, *data)
@@ -136,71 +186,278 @@ class ParentRemovalBinder(Node[P_co, R]):
     def __init__(self, parent: P_co, oid: NodeIdT):
         super().__init__(parent)
         self.uuid = oid
-        self.accept(NodeDestroyed, self.check_destroyed)
+        self.on_destroyed(oid, self.check_destroyed)
+
+    def check_destroyed(self, _oid: NodeIdT):
+        self.parent.destroy()
+
+
+@final
+class _Listeners[V]:
+    """The listeners of an event bound to one subject, by priority. Both lists are sorted by priority with bisect."""
+
+    def __init__(self):
+        self.priorities: list[int] = []
+        self.buckets: list[Bucket[V]] = []
+
+    def add(self, priority: int, node: Node[Any, Any], callback: V):
+        i = bisect_left(self.priorities, priority)
+        if i == len(self.priorities) or self.priorities[i] != priority:
+            self.priorities.insert(i, priority)
+            self.buckets.insert(i, {})
+        self.buckets[i][node] = callback
+
+    def discard(self, priority: int, node: Node[Any, Any]):
+        i = bisect_left(self.priorities, priority)
+        bucket = self.buckets[i]
+        del bucket[node]
+        if not bucket:
+            del self.priorities[i]
+            del self.buckets[i]
+
+
+@final
+class _EventListeners[V]:
+    """
+    All the listeners of an event by subject.
+
+    The listeners of every subject that has listeners bound to it (merged with the listeners of every subject),
+    and of every subject for the others, are flattened into snapshot tuples in the order they run. The snapshots are
+    copied on write: a change drops the snapshots it affects, and they are built again on the next dispatch,
+    so dispatching allocates nothing. `version` counts the changes, so that a dispatch can tell that its snapshot
+    is stale and check that the rest of its listeners are still in their buckets.
+    """
+
+    def __init__(self):
+        self.by_subject: dict[Subject, _Listeners[V]] = {}
+        self.version = 0
+        self.__layers: dict[Subject, tuple[Layer[V], ...]] = {}
+        self.__callbacks: dict[Subject, tuple[V, ...]] = {}
+
+    def add(self, subject: Subject, priority: int, node: Node[Any, Any], callback: V):
+        listeners = self.by_subject.get(subject)
+        if listeners is None:
+            listeners = self.by_subject[subject] = _Listeners[V]()
+        listeners.add(priority, node, callback)
+        self.__changed(subject)
+
+    def discard(self, subject: Subject, priority: int, node: Node[Any, Any]):
+        """Removes the listener, and the subject once it has no listeners, so that destroyed subjects are freed."""
+        listeners = self.by_subject[subject]
+        listeners.discard(priority, node)
+        if not listeners.buckets:
+            del self.by_subject[subject]
+        self.__changed(subject)
+
+    def __changed(self, subject: Subject):
+        self.version += 1
+        if subject is None:
+            self.__layers.clear()
+            self.__callbacks.clear()
+        else:
+            self.__layers.pop(subject, None)
+            self.__callbacks.pop(subject, None)
+
+    def __buckets(self, subject: Subject) -> list[Bucket[V]]:
+        everyone = self.by_subject.get(None)
+        if subject is None:
+            return everyone.buckets if everyone is not None else []
+        scoped = self.by_subject[subject]
+        if everyone is None:
+            return scoped.buckets
+        # A stable sort keeps the listeners of every subject first among the same priority
+        pairs = [
+            *zip(everyone.priorities, everyone.buckets, strict=True),
+            *zip(scoped.priorities, scoped.buckets, strict=True),
+        ]
+        merged = sorted(pairs, key=itemgetter(0))
+        return [bucket for _, bucket in merged]
+
+    def layers(self, subject: Subject) -> tuple[Layer[V], ...]:
+        """The buckets of every subject and of `subject` with their listeners, in the order they run."""
+        if subject not in self.by_subject:
+            subject = None
+        if (layers := self.__layers.get(subject)) is None:
+            layers = self.__layers[subject] = tuple(
+                (bucket, tuple(bucket.items())) for bucket in self.__buckets(subject)
+            )
+        return layers
+
+    def callbacks(self, subject: Subject) -> tuple[V, ...]:
+        """Just the callbacks in the order they run, for the math targets."""
+        if subject not in self.by_subject:
+            subject = None
+        if (callbacks := self.__callbacks.get(subject)) is None:
+            buckets = self.__buckets(subject)
+            callbacks = self.__callbacks[subject] = tuple(chain.from_iterable(bucket.values() for bucket in buckets))
+        return callbacks
+
+
+@dataclass
+class MemoStats:
+    hits: int = 0
+    misses: int = 0
 
-    def check_destroyed(self, oid: NodeIdT):
-        if oid == self.uuid:
-            self.parent.destroy()
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class _Memo:
+    """The value of a memoized math target for a context, see MathTarget.memoize."""
+
+    context: object
+    version: int
+    init_value: object
+    value: object
 
 
 class ListenerController(Generic[R]):
+    """
+    Keeps the callbacks of every trigger and math target by the subject they are bound to and by priority.
+    An event about a subject only reaches the listeners of every subject and the ones bound to that subject,
+    the ones of every subject go first among the same priority.
+
+    Events are dispatched far more often than their listeners change (the speed of every moving character
+    in every frame), so the listeners of every event and subject are flattened into a tuple in the order they run
+    on the first dispatch, which is dropped whenever a listener of that event and subject, or of every subject,
+    is added or removed.
+
+    Every change of the callbacks of a math target also bumps its version, which invalidates the memoized values
+    of the target. `memo_stats` counts the memo hits and misses of every memoized target.
+    """
+
     def __init__(self):
-        self._node_triggers: dict[Node[Any, R], set[tuple[AnyTrigger, TriggerPriority]]] = defaultdict(set)
-        self._node_maths: dict[Node[Any, R], set[tuple[MathTarget[Any, Any], MathPriority]]] = defaultdict(set)
-        self._triggers: dict[Trigger[*tuple[Any, ...]], NodeDictEvent[R, *tuple[Any, ...]]] = defaultdict(dict)
-        self._mathtargets: dict[MathTarget[Any, Any], NodeDictMath[R, Any, Any]] = defaultdict(dict)
+        self._node_triggers: dict[Node[Any, R], set[tuple[AnyTrigger, Subject, TriggerPriority]]] = defaultdict(set)
+        self._node_maths: dict[Node[Any, R], set[tuple[MathTarget[Any, Any], Subject, MathPriority]]] = defaultdict(set)
+        self._triggers: dict[AnyTrigger, _EventListeners[Callable[..., None]]] = defaultdict(_EventListeners)
+        self._mathtargets: dict[MathTarget[Any, Any], _EventListeners[Callable[[Any, Any], Any]]] = defaultdict(
+            _EventListeners
+        )
+        self._math_versions: dict[MathTarget[Any, Any], int] = defaultdict(int)
+        # Memoized values by the id of their context, which the memo keeps alive until the node is removed
+        self._memos: dict[MathTarget[Any, Any], dict[int, _Memo]] = defaultdict(dict)
+        self.memo_stats: dict[MathTarget[Any, Any], MemoStats] = defaultdict(MemoStats)
+        # The callbacks waiting for a node to be destroyed by its id, and the ids every node waits for
+        self._destroyed: dict[NodeIdT, dict[Node[Any, R], Callable[[NodeIdT], None]]] = defaultdict(dict)
+        self._node_destroyed: dict[Node[Any, R], set[NodeIdT]] = defaultdict(set)
 
     def remove(self, node: Node[Any, R]):
         triggers = self._node_triggers.pop(node, set())
-        for t, p in triggers:
-            self._triggers[t][p].pop(node)
+        for t, s, p in triggers:
+            self._triggers[t].discard(s, p, node)
         maths = self._node_maths.pop(node, set())
-        for t, p in maths:
-            self._mathtargets[t][p].pop(node)
+        for t, s, p in maths:
+            self._mathtargets[t].discard(s, p, node)
+            self._math_versions[t] += 1
+        for memo in self._memos.values():
+            memo.pop(id(node), None)
+        for oid in self._node_destroyed.pop(node, set()):
+            if (waiting := self._destroyed.get(oid)) is not None:
+                waiting.pop(node, None)
+                if not waiting:
+                    del self._destroyed[oid]
 
     def remove_all(self):
         self._node_triggers.clear()
         self._node_maths.clear()
         self._triggers.clear()
         self._mathtargets.clear()
+        self._memos.clear()
+        self._destroyed.clear()
+        self._node_destroyed.clear()
+
+    def add_destroyed(self, node: Node[Any, R], oid: NodeIdT, callback: Callable[[NodeIdT], None]):
+        self._node_destroyed[node].add(oid)
+        self._destroyed[oid][node] = callback
+
+    def run_destroyed(self, oid: NodeIdT):
+        waiting = self._destroyed.pop(oid, None)
+        if waiting is None:
+            return
+        for node, callback in waiting.items():
+            # Skips the nodes destroyed by the callbacks before them
+            if oid not in (watched := self._node_destroyed.get(node, set())):
+                continue
+            watched.discard(oid)
+            if not watched:
+                del self._node_destroyed[node]
+            callback(oid)
 
     def add_trigger(
-        self, node: Node[Any, R], event: Trigger[*E], callback: Callable[[*E], None], priority: TriggerPriority
+        self,
+        node: Node[Any, R],
+        event: Trigger[*E],
+        callback: Callable[[*E], None],
+        priority: TriggerPriority,
+        subject: Subject = None,
     ):
-        self._node_triggers[node].add((event, priority))
-        if priority not in self._triggers[event]:
-            self._triggers[event][priority] = {}
-            self._triggers[event] = dict(sorted(self._triggers[event].items()))
-        # pyright doesn't like the variance of Any
-        self._triggers[event][priority][node] = callback  # pyright: ignore[reportArgumentType]
+        if subject is not None and event.subject is None:
+            raise ValueError(f"Trigger {event.name} has no subjects")
+        self._node_triggers[node].add((event, subject, priority))
+        self._triggers[event].add(subject, priority, node, callback)
 
     def add_math_target(
-        self, node: Node[Any, R], event: MathTarget[T, C], callback: Callable[[T, C], T], priority: MathPriority
+        self,
+        node: Node[Any, R],
+        event: MathTarget[T, C],
+        callback: Callable[[T, C], T],
+        priority: MathPriority,
+        subject: Subject = None,
     ):
-        self._node_maths[node].add((event, priority))
-        if priority not in self._mathtargets[event]:
-            self._mathtargets[event][priority] = {}
-            self._mathtargets[event] = dict(sorted(self._mathtargets[event].items()))
-        self._mathtargets[event][priority][node] = callback
+        if subject is not None and event.subject is None:
+            raise ValueError(f"Math target {event.name} has no subjects")
+        self._node_maths[node].add((event, subject, priority))
+        self._mathtargets[event].add(subject, priority, node, callback)
+        self._math_versions[event] += 1
 
     def run_trigger(self, event: Trigger[*E], *context: *E):
+        listeners = self._triggers.get(event)
         if event.debug:
-            print(f"Dispatching event {event.name} with data: {context} to receivers: {self._triggers[event]}")  # noqa: T201
-        for prior_dict in self._triggers[event].values():
-            for k, t in list(prior_dict.items()):
-                if k in prior_dict:
+            receivers = listeners.by_subject if listeners is not None else {}
+            print(f"Dispatching event {event.name} with data: {context} to receivers: {receivers}")  # noqa: T201
+        if listeners is None:
+            return
+        subject = event.subject(*context) if event.subject is not None else None
+        version, validates = listeners.version, event.validates
+        for bucket, entries in listeners.layers(subject):
+            for k, t in entries:
+                # The snapshot only goes stale when the listeners change during the dispatch
+                if listeners.version == version or k in bucket:
                     t(*context)
                 elif event.debug:
                     print(f"Dispatching to node: {k} skipped as the node no longer accepts this trigger")  # noqa: T201
-                if not event.is_valid(*context):
+                if validates and not event.is_valid(*context):
                     break
 
     def run_math(self, event: MathTarget[T, C], init_value: T, context: C) -> T:
+        listeners = self._mathtargets.get(event)
         if event.debug:
-            print(f"Dispatching math target {event.name} with data: {context} to receivers: {self._mathtargets[event]}")  # noqa: T201
-        for prior_dict in self._mathtargets[event].values():
-            for t in prior_dict.values():
-                init_value = t(init_value, context)
+            receivers = listeners.by_subject if listeners is not None else {}
+            print(f"Dispatching math target {event.name} with data: {context} to receivers: {receivers}")  # noqa: T201
+        if listeners is None:
+            return init_value
+        if not event.memoize:
+            return self.__evaluate(event, listeners, init_value, context)
+        memos, version, stats = self._memos[event], self._math_versions[event], self.memo_stats[event]
+        memo = memos.get(id(context))
+        if memo is not None and memo.context is context and memo.version == version and memo.init_value == init_value:
+            stats.hits += 1
+            return cast(T, memo.value)
+        stats.misses += 1
+        value = self.__evaluate(event, listeners, init_value, context)
+        memos[id(context)] = _Memo(context, version, init_value, value)
+        return value
+
+    @staticmethod
+    def __evaluate(
+        event: MathTarget[T, C], listeners: _EventListeners[Callable[[Any, Any], Any]], init_value: T, context: C
+    ) -> T:
+        subject = event.subject(context) if event.subject is not None else None
+        for t in listeners.callbacks(subject):
+            init_value = t(init_value, context)
         return init_value
 
 
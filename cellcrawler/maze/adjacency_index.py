@@ -0,0 +1,52 @@
+from typing import final
+
+import numpy as np
+import numpy.typing as npt
+
+type CellId = int
+
+
+@final
+class AdjacencyIndex:
+    """
+    Compressed sparse row (CSR) neighbour index of a maze.
+
+    Cells are identified by a single int, `y * width + x`. The walkable neighbours of cell `c` are
+    `targets[offsets[c]:offsets[c + 1]]`, in the same order as `MazeData.get_adjacent` returns them
+    (left, right, up, down). The index is built once per level, so hot loops can iterate neighbours
+    without bounds checks, wall checks or tuple allocations.
+    """
+
+    def __init__(self, walkable: npt.NDArray[np.bool_]):
+        height, width = walkable.shape
+        size = height * width
+        # For every direction: can a cell step there? Stacked in the get_adjacent order.
+        steps = np.zeros((4, height, width), dtype=np.bool_)
+        steps[0, :, 1:] = walkable[:, :-1]
+        steps[1, :, :-1] = walkable[:, 1:]
+        steps[2, 1:, :] = walkable[:-1, :]
+        steps[3, :-1, :] = walkable[1:, :]
+        steps = steps.reshape(4, size).T
+
+        cells, directions = steps.nonzero()
+        deltas = np.array([-1, 1, -width, width], dtype=np.int32)
+        self.width = width
+        self.height = height
+        self.offsets: npt.NDArray[np.int32] = np.zeros(size + 1, dtype=np.int32)
+        np.cumsum(steps.sum(axis=1), out=self.offsets[1:])
+        self.targets: npt.NDArray[np.int32] = (cells + deltas[directions]).astype(np.int32)
+        self.offsets.flags.writeable = False
+        self.targets.flags.writeable = False
+        # Slicing memoryviews yields Python ints and is noticeably faster than slicing numpy arrays
+        self.__offsets = memoryview(self.offsets)
+        self.__targets = memoryview(self.targets)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def neighbours(self, cell: CellId) -> memoryview:
+        """Walkable neighbours of the cell. The result is a read-only view that must not outlive the level."""
+        return self.__targets[self.__offsets[cell] : self.__offsets[cell + 1]]
+
+    def degree(self, cell: CellId) -> int:
+        return self.__offsets[cell + 1] - self.__offsets[cell]
@@ -1,15 +1,26 @@
 from typing import final, override
 
+import numpy as np
+
 from cellcrawler.lib.base import FileLoader, inject_globals
 from cellcrawler.maze.level_factory import LevelFactory
 from cellcrawler.maze.maze_data import MazeCell, MazeData
+from cellcrawler.maze.pathfinding.distance_table import all_pairs_distances, load_distance_matrix
 
 
 @final
 class ConstLevelFactory(LevelFactory):
-    def __init__(self, path: str) -> None:
+    """
+    Loads a floor from a map file. Floors with at most `distance_table_cells` open cells get the all-pairs
+    distance matrix, which is stored next to the map on the first load, see DistanceTable.
+    """
+
+    DISTANCE_TABLE_CELLS = 1024
+
+    def __init__(self, path: str, distance_table_cells: int = DISTANCE_TABLE_CELLS) -> None:
         super().__init__()
         self.path = path
+        self.distance_table_cells = distance_table_cells
 
     def char_to_mode(self, char: str) -> MazeCell:
         match char:
@@ -25,4 +36,9 @@ class ConstLevelFactory(LevelFactory):
     def _make_level(self, fl: FileLoader) -> MazeData:
         content = [x.strip() for x in fl(self.path).split("\n")]
         content = [[self.char_to_mode(y) for y in x] for x in content if x]
-        return MazeData(content)
+        maze = MazeData(content)
+        if np.count_nonzero(maze.walkable) <= self.distance_table_cells:
+            system_path = fl.system_path(self.path)
+            matrix = all_pairs_distances(maze) if system_path is None else load_distance_matrix(maze, system_path)
+            maze.set_distance_matrix(matrix)
+        return maze
@@ -0,0 +1,56 @@
+import random
+from array import array
+from collections.abc import Iterable
+from typing import final
+
+from cellcrawler.maze.adjacency_index import CellId
+
+
+@final
+class FreeCellIndex:
+    """
+    A set of cell ids with O(1) insertion, removal and uniform random sampling.
+
+    Cells are kept in a dense list, and every cell remembers its position in that list,
+    so a removal swaps the last element into the freed slot.
+    """
+
+    def __init__(self, cells: Iterable[CellId], size: int):
+        self.__cells: list[CellId] = []
+        self.__positions = array("i", [-1]) * size
+        for cell in cells:
+            self.add(cell)
+
+    def __len__(self):
+        return len(self.__cells)
+
+    def __contains__(self, cell: CellId):
+        return self.__positions[cell] >= 0
+
+    def __iter__(self):
+        return iter(self.__cells)
+
+    def add(self, cell: CellId):
+        if self.__positions[cell] >= 0:
+            return
+        self.__positions[cell] = len(self.__cells)
+        self.__cells.append(cell)
+
+    def discard(self, cell: CellId):
+        pos = self.__positions[cell]
+        if pos < 0:
+            return
+        last = self.__cells.pop()
+        if last != cell:
+            self.__cells[pos] = last
+            self.__positions[last] = pos
+        self.__positions[cell] = -1
+
+    def choice(self) -> CellId:
+        if not self.__cells:
+            raise IndexError("no free cells")
+        return random.choice(self.__cells)
+
+    def sample(self, count: int) -> list[CellId]:
+        """Distinct random cells. Takes O(count) time regardless of the maze size."""
+        return random.sample(self.__cells, count)
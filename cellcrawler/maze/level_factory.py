@@ -1,15 +1,35 @@
 import abc
+import time
+from typing import ClassVar
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+from direct.directnotify.Notifier import Notifier
 
 from cellcrawler.core.environment import Environment
 from cellcrawler.core.roguelike_calc_tree import LevelTree
 from cellcrawler.lib.managed_node import ManagedNode
 from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.landmarks import landmark_fields
 
 
 class LevelFactory(abc.ABC):
+    notify: ClassVar[Notifier] = directNotify.newCategory("LevelFactory")
+
+    # How many landmark fields of the A* heuristic every floor gets, see Landmarks. 0 turns them off.
+    LANDMARKS: int = 8
+
     @abc.abstractmethod
     def _make_level(self) -> MazeData:
         pass
 
     def make_env(self, parent: ManagedNode, level_tree: LevelTree) -> Environment:
-        return Environment(parent, level_tree, self._make_level())
+        maze = self._make_level()
+        maze.build_adjacency()
+        if self.LANDMARKS:
+            start = time.perf_counter()
+            fields = landmark_fields(maze, self.LANDMARKS)
+            elapsed = time.perf_counter() - start
+            maze.set_landmark_fields(fields)
+            floor = f"{maze.width}x{maze.height}"
+            self.notify.info(f"{len(fields)} landmarks of {floor}: {elapsed * 1000:.1f} ms, {fields.nbytes >> 10} KiB")
+        return Environment(parent, level_tree, maze)
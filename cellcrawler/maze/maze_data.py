@@ -1,6 +1,13 @@
-import dataclasses
-from collections import Counter
+import itertools
+from collections.abc import Sequence
 from enum import Enum, auto
+from typing import ClassVar
+
+import numpy as np
+import numpy.typing as npt
+
+from cellcrawler.maze.adjacency_index import AdjacencyIndex, CellId
+from cellcrawler.maze.free_cell_index import FreeCellIndex
 
 
 class MazeCellBasic(Enum):
@@ -10,6 +17,15 @@ class MazeCellBasic(Enum):
 
 MazeCell = MazeCellBasic
 
+type CellGrid = npt.NDArray[np.uint8]
+type WalkableMask = npt.NDArray[np.bool_]
+# Region (room or corridor) of every cell, -1 for walls and doorways
+type RegionLabels = npt.NDArray[np.int32]
+# Distances between every two walkable cells, in the order of their ids, see DistanceTable
+type DistanceMatrix = npt.NDArray[np.uint16]
+# Distances from a few landmark cells to every cell, one row per landmark, -1 where unreachable, see Landmarks
+type LandmarkFields = npt.NDArray[np.int32]
+
 
 def is_visitable(cell: MazeCell):
     match cell:
@@ -19,45 +35,162 @@ def is_visitable(cell: MazeCell):
             return False
 
 
-@dataclasses.dataclass
+# Lookup tables from the stored uint8 code (MazeCell.value) back to the cell and its walkability.
+_CELL_BY_CODE: list[MazeCell | None] = [None] * 256
+_WALKABLE_BY_CODE = np.zeros(256, dtype=np.bool_)
+for _cell in MazeCell:
+    _CELL_BY_CODE[_cell.value] = _cell
+    _WALKABLE_BY_CODE[_cell.value] = is_visitable(_cell)
+
+
 class MazeData:
-    cells: list[list[MazeCell]]
-    occupations: dict[tuple[int, int], int] = dataclasses.field(default_factory=Counter[tuple[int, int]])
+    """
+    The layout of a single floor.
+
+    Cells are stored as a contiguous (height, width) uint8 array of MazeCell values, together with a walkable mask
+    computed once on creation, so that neighbour checks and whole-floor scans don't go through enum objects.
+    The maze can be created either from nested lists of MazeCell (as the level factories do)
+    or directly from a uint8 array of MazeCell values.
+
+    `version` identifies the layout for caches of pathfinding data, no two mazes share a version.
+
+    Factories that know how the floor splits into rooms and corridors may pass the `regions` labels. Every open cell
+    outside of a region must be a doorway between regions, see RoomGraph.
+
+    Small fixed floors may also carry the precomputed `distance_matrix`, see DistanceTable, and every floor built
+    by a LevelFactory carries the `landmark_fields` of the A* heuristic, see Landmarks.
+    """
+
+    __versions: ClassVar = itertools.count()
+
+    def __init__(self, cells: Sequence[Sequence[MazeCell]] | CellGrid, regions: RegionLabels | None = None):
+        if isinstance(cells, np.ndarray):
+            grid = np.ascontiguousarray(cells, dtype=np.uint8)
+            if grid.ndim != 2:  # noqa: PLR2004
+                raise ValueError("cell array must be two-dimensional")
+            if not grid.shape[0]:
+                raise ValueError("must have >= 1 row")
+            if not grid.shape[1]:
+                raise ValueError("must have >= 1 column")
+            codes: list[int] = np.unique(grid).tolist()
+            if not all(_CELL_BY_CODE[code] for code in codes):
+                raise ValueError("unknown cell codes")
+        else:
+            if not cells:
+                raise ValueError("must have >= 1 row")
+            if not cells[0]:
+                raise ValueError("must have >= 1 column")
+            if len({len(x) for x in cells}) != 1:
+                raise ValueError("uneven cells")
+            grid = np.array([[cell.value for cell in row] for row in cells], dtype=np.uint8)
+
+        if regions is not None:
+            if regions.shape != grid.shape:
+                raise ValueError("region labels must have the shape of the maze")
+            regions = np.ascontiguousarray(regions, dtype=np.int32)
+
+        self.grid: CellGrid = grid
+        self.regions: RegionLabels | None = regions
+        self.version: int = next(MazeData.__versions)
+        self.height: int = grid.shape[0]
+        self.width: int = grid.shape[1]
+        self.walkable: WalkableMask = _WALKABLE_BY_CODE[grid]
+        # Flat copy of the mask for point lookups from Python code, indexing bytes is much faster than numpy scalars
+        self.__walkable_flat = self.walkable.tobytes()
+        # How many characters stand in each cell, and which walkable cells nobody stands in
+        self.occupancy: npt.NDArray[np.int32] = np.zeros(grid.shape, dtype=np.int32)
+        self.__occupancy_flat = self.occupancy.reshape(-1)
+        self.free_cells: FreeCellIndex = FreeCellIndex(np.flatnonzero(self.walkable).tolist(), grid.size)
+        self.__adjacency: AdjacencyIndex | None = None
+        self.distance_matrix: DistanceMatrix | None = None
+        self.landmark_fields: LandmarkFields | None = None
+
+    def build_adjacency(self) -> AdjacencyIndex:
+        self.__adjacency = AdjacencyIndex(self.walkable)
+        return self.__adjacency
+
+    def set_distance_matrix(self, matrix: DistanceMatrix):
+        cells = int(np.count_nonzero(self.walkable))
+        if matrix.shape != (cells, cells) or matrix.dtype != np.uint16:
+            raise ValueError("distance matrix must be a square uint16 matrix over the walkable cells")
+        self.distance_matrix = matrix
+
+    def set_landmark_fields(self, fields: LandmarkFields):
+        if fields.ndim != 2 or fields.shape[1] != self.grid.size or fields.dtype != np.int32:  # noqa: PLR2004
+            raise ValueError("landmark fields must be int32 rows over the cells of the maze")
+        self.landmark_fields = fields
+
+    @property
+    def adjacency(self) -> AdjacencyIndex:
+        """
+        The neighbour index of the maze. It is built by LevelFactory.make_env when the level is created,
+        mazes created any other way build it on first use.
+        """
+        if self.__adjacency is None:
+            return self.build_adjacency()
+        return self.__adjacency
+
+    @property
+    def walkable_flat(self) -> bytes:
+        """The walkable mask as bytes indexed by cell id, for point lookups in hot loops."""
+        return self.__walkable_flat
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def cell_id(self, x: int, y: int) -> CellId:
+        return y * self.width + x
+
+    def cell_pos(self, cell: CellId) -> tuple[int, int]:
+        y, x = divmod(cell, self.width)
+        return x, y
 
     def set_occupied(self, pos: tuple[int, int]):
-        self.occupations[pos] += 1
+        if not self.in_bounds(*pos):
+            return
+        cell = self.cell_id(*pos)
+        self.__occupancy_flat[cell] += 1
+        self.free_cells.discard(cell)
 
     def clear_occupied(self, pos: tuple[int, int]):
-        self.occupations[pos] -= 1
-        if not self.occupations[pos]:
-            del self.occupations[pos]
+        if not self.in_bounds(*pos):
+            return
+        cell = self.cell_id(*pos)
+        self.__occupancy_flat[cell] -= 1
+        if not self.__occupancy_flat[cell] and self.__walkable_flat[cell]:
+            self.free_cells.add(cell)
+
+    def move_occupied(self, old_pos: tuple[int, int] | None, new_pos: tuple[int, int]):
+        if old_pos is not None:
+            self.clear_occupied(old_pos)
+        self.set_occupied(new_pos)
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.__occupancy_flat[self.cell_id(x, y)])
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        if not self.in_bounds(x, y):
+            return False
+        return bool(self.__walkable_flat[y * self.width + x])
 
     def get_adjacent(self, x: int, y: int):
         out: list[tuple[int, int]] = []
-        if not (0 <= x < len(self.cells[0])) or not (0 <= y < len(self.cells)):
+        width, height = self.width, self.height
+        if not (0 <= x < width) or not (0 <= y < height):
             return out
-        if x > 0 and is_visitable(self.cells[y][x - 1]):
+        walkable = self.__walkable_flat
+        idx = y * width + x
+        if x > 0 and walkable[idx - 1]:
             out.append((x - 1, y))
-        if x + 1 < len(self.cells[0]) and is_visitable(self.cells[y][x + 1]):
+        if x + 1 < width and walkable[idx + 1]:
             out.append((x + 1, y))
-        if y > 0 and is_visitable(self.cells[y - 1][x]):
+        if y > 0 and walkable[idx - width]:
             out.append((x, y - 1))
-        if y + 1 < len(self.cells) and is_visitable(self.cells[y + 1][x]):
+        if y + 1 < height and walkable[idx + width]:
             out.append((x, y + 1))
         return out
 
-    def __post_init__(self):
-        if not self.cells:
-            raise ValueError("must have >= 1 row")
-        if not self.cells[0]:
-            raise ValueError("must have >= 1 column")
-        if len({len(x) for x in self.cells}) != 1:
-            raise ValueError("uneven cells")
-
-    @property
-    def width(self):
-        return len(self.cells[0])
-
     @property
-    def height(self):
-        return len(self.cells)
+    def cells(self) -> list[list[MazeCell]]:
+        """A freshly built nested-list copy of the maze. Prefer `grid` and `walkable` in hot code."""
+        return [[_CELL_BY_CODE[code] for code in row] for row in self.grid.tolist()]
@@ -0,0 +1,137 @@
+import sys
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import final
+
+import numpy as np
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.distance_field import UNREACHABLE, DistanceField
+
+# Cells of some strips, as strip index -> bits of the strip, see BitsetMaze
+type StripBits = dict[int, int]
+
+_INT16_MAX = 2**15 - 1
+
+
+@final
+class BitsetMaze:
+    """
+    Packed view of the walkable mask. The floor is cut into horizontal strips of `strip_rows` rows, and every
+    strip is a single Python int with one bit per cell: bit `row * stride + x` of a strip is the cell
+    (x, strip * strip_rows + row). Every row has an extra zero bit at the end (`stride` is `width + 1`),
+    so that shifting a strip left or right never moves a cell into the next row.
+
+    A 1000x1000 floor takes about 130 KiB, and a BFS layer is expanded a whole strip per operation.
+    The strips keep the cost of a layer proportional to the part of the floor the frontier is in.
+    """
+
+    STRIP_ROWS = 8
+
+    def __init__(self, maze: MazeData, strip_rows: int = STRIP_ROWS):
+        self.width = maze.width
+        self.height = maze.height
+        self.version = maze.version
+        self.stride = maze.width + 1
+        self.strip_rows = strip_rows
+        self.strip_count = -(-maze.height // strip_rows)
+        padded = np.zeros((self.strip_count * strip_rows, self.stride), dtype=np.bool_)
+        padded[: maze.height, : maze.width] = maze.walkable
+        packed = np.packbits(padded.reshape(self.strip_count, -1), axis=1, bitorder="little")
+        self.strips: list[int] = [int.from_bytes(strip.tobytes(), "little") for strip in packed]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.strips) + sum(sys.getsizeof(strip) for strip in self.strips)
+
+    def pack(self, cells: Iterable[CellId]) -> StripBits:
+        out: defaultdict[int, int] = defaultdict(int)
+        for cell in cells:
+            y, x = divmod(cell, self.width)
+            strip, row = divmod(y, self.strip_rows)
+            out[strip] |= 1 << (row * self.stride + x)
+        return dict(out)
+
+    def unpack(self, bits: StripBits) -> list[CellId]:
+        out: list[CellId] = []
+        for strip, value in sorted(bits.items()):
+            (positions,) = np.nonzero(self.__unpack_strip(value))
+            rows, xs = np.divmod(positions, self.stride)
+            out.extend(((strip * self.strip_rows + rows) * self.width + xs).tolist())
+        return out
+
+    def layers(self, sources: Iterable[CellId]) -> Iterator[StripBits]:
+        """
+        Yields the BFS layers from the walkable sources: the cells at distance 0, 1, 2 and so on.
+        A layer is expanded with a few shifts per strip: by one bit to the sides, by a row up and down,
+        and the edge rows spill over to the neighbouring strips. The result is masked with the walkable and
+        not yet visited cells. Only the strips the frontier touches are processed.
+        """
+        strips = self.strips
+        stride = self.stride
+        last_strip = self.strip_count - 1
+        last_row_shift = stride * (self.strip_rows - 1)
+        first_row = (1 << stride) - 1
+        frontier = {s: bits & strips[s] for s, bits in self.pack(sources).items() if bits & strips[s]}
+        seen = [0] * self.strip_count
+        for s, bits in frontier.items():
+            seen[s] = bits
+        while frontier:
+            yield frontier
+            spread: dict[int, int] = {}
+            for s, bits in frontier.items():
+                spread[s] = spread.get(s, 0) | (bits << 1) | (bits >> 1) | (bits << stride) | (bits >> stride)
+                if s < last_strip and (up := bits >> last_row_shift):
+                    spread[s + 1] = spread.get(s + 1, 0) | up
+                if s and (down := bits & first_row):
+                    spread[s - 1] = spread.get(s - 1, 0) | (down << last_row_shift)
+            frontier = {}
+            for s, bits in spread.items():
+                if new := bits & strips[s] & ~seen[s]:
+                    frontier[s] = new
+                    seen[s] |= new
+
+    def reachable(self, sources: Iterable[CellId]) -> StripBits:
+        """All the cells reachable from the sources."""
+        out: defaultdict[int, int] = defaultdict(int)
+        for layer in self.layers(sources):
+            for s, bits in layer.items():
+                out[s] |= bits
+        return dict(out)
+
+    def distances(self, sources: Iterable[CellId]) -> DistanceField:
+        """
+        The same distance field as `bfs_distances`. The distances are kept as bit planes: plane k has the cells
+        whose distance has bit k set, so a layer is stamped with a few ORs, and the planes are unpacked at the end.
+        """
+        planes: list[list[int]] = []
+        reached = [0] * self.strip_count
+        level = 0
+        for level, layer in enumerate(self.layers(sources)):
+            while len(planes) < level.bit_length():
+                planes.append([0] * self.strip_count)
+            level_planes = [plane for k, plane in enumerate(planes) if level >> k & 1]
+            for s, bits in layer.items():
+                reached[s] |= bits
+                for plane in level_planes:
+                    plane[s] |= bits
+
+        out = np.full((self.strip_count, self.strip_rows * self.stride), UNREACHABLE, dtype=np.int32)
+        for s, bits in enumerate(reached):
+            if not bits:
+                continue
+            dist = np.zeros(self.strip_rows * self.stride, dtype=np.int32)
+            for k, plane in enumerate(planes):
+                if plane[s]:
+                    dist |= self.__unpack_strip(plane[s]).astype(np.int32) << k
+            out[s] = np.where(self.__unpack_strip(bits), dist, UNREACHABLE)
+        grid = out.reshape(-1, self.stride)[: self.height, : self.width]
+        typecode, dtype = ("h", np.int16) if level <= _INT16_MAX else ("i", np.int32)
+        return array(typecode, grid.astype(dtype).tobytes())
+
+    def __unpack_strip(self, bits: int):
+        size = self.strip_rows * self.stride
+        packed = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, count=size, bitorder="little").astype(np.bool_)
@@ -1,14 +1,55 @@
+import time
 import weakref
-from collections import deque
-from collections.abc import Callable
+from array import array
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Protocol, Self, final, override
 
 from direct.directnotify.DirectNotifyGlobal import directNotify
 
 from cellcrawler.lib.base import DependencyInjector
 from cellcrawler.lib.managed_node import ManagedNode
+from cellcrawler.maze.adjacency_index import AdjacencyIndex, CellId
 from cellcrawler.maze.maze_data import MazeData
-from cellcrawler.maze.pathfinding.pathfinding import PathfindingService
+from cellcrawler.maze.pathfinding.distance_field import (
+    NO_STEP,
+    UNKNOWN_STEP,
+    DistanceField,
+    FlowField,
+    bfs_with_flow,
+    downhill_step,
+    flow_step,
+    iter_bfs_with_flow,
+    iter_safety_distances,
+    move_source,
+    new_distance_field,
+    new_flow_field,
+    safety_distances,
+)
+from cellcrawler.maze.pathfinding.distance_table import DistanceTable
+from cellcrawler.maze.pathfinding.field_cache import DistanceFieldCache, Fields, TargetField
+from cellcrawler.maze.pathfinding.landmarks import Landmarks
+from cellcrawler.maze.pathfinding.pathfinding import PathfindingService, RegionOfInterest
+from cellcrawler.maze.pathfinding.point_search import Heuristic, jump_point_search
+from cellcrawler.maze.pathfinding.room_graph import RoomGraph
+from cellcrawler.maze.pathfinding.wavefront import step_changes
+
+# Builds the distance and flow fields of a maze from the given sources
+type FieldEngine = Callable[[MazeData, Iterable[CellId]], tuple[DistanceField, FlowField, FlowField]]
+
+
+def bfs_engine(maze: MazeData, sources: Iterable[CellId]):
+    return bfs_with_flow(maze.adjacency, sources)
+
+
+def _iter_player_fields(
+    adjacency: AdjacencyIndex, source: CellId, chunk: int
+) -> Generator[None, None, tuple[Fields, DistanceField]]:
+    """The resumable BFS of the player fields followed by the sweep of their safety map."""
+    fields = yield from iter_bfs_with_flow(adjacency, [source], chunk)
+    safety = yield from iter_safety_distances(fields[0], adjacency, chunk)
+    return fields, safety
 
 
 class SupportsGetCellPos(Protocol):
@@ -16,60 +57,387 @@ class SupportsGetCellPos(Protocol):
     def run_on_cell_change(self, func: Callable[[Self], None], /) -> None: ...
 
 
+@dataclass
+class TaggedField:
+    """Fields built off the main loop, tagged with the maze version and the player cell they were built for."""
+
+    version: int
+    source: CellId
+    distances: DistanceField
+    toward: FlowField
+    away: FlowField
+    safety: DistanceField
+
+    @classmethod
+    def build(cls, engine: FieldEngine, maze: MazeData, source: CellId):
+        distances, toward, away = engine(maze, [source])
+        return cls(maze.version, source, distances, toward, away, safety_distances(distances, maze.adjacency))
+
+
+@dataclass
+class _PendingField:
+    maze: MazeData
+    source: CellId
+    steps: Generator[None, None, tuple[Fields, DistanceField]]
+
+
+@dataclass
+class _BackgroundField:
+    maze: MazeData
+    source: CellId
+    future: Future[TaggedField]
+
+
 @final
 class CharacterPathfinding(PathfindingService):
+    """
+    Keeps the distance field from the player to every cell of the maze, along with the flow fields
+    toward the player and away from them, which give every cell's next step in O(1).
+    The fields are flat int16/int32 arrays indexed by cell id, see distance_field.
+
+    In the incremental mode, a player step to an adjacent cell repairs only the part of the field whose distances
+    actually change, instead of running a full BFS over the floor. Note that the maze is a bipartite graph,
+    so a step changes the distance of *every* cell reachable from the player by exactly one. The repair therefore
+    rarely pays off for the player field: it gives up and runs a full BFS as soon as it has touched more than
+    INCREMENTAL_BUDGET of the floor, and it is not the default.
+
+    In the time-sliced mode (`time_slice_us` is set), a new field for the same floor is built in the background
+    by a resumable BFS that advance() runs for at most `time_slice_us` microseconds per frame. Until it is done,
+    readers keep seeing the last complete field, then all the fields are swapped at once and the registered nodes
+    are notified. The first field and the first field of a new floor are still computed immediately.
+
+    In the background mode, the new fields are built by a worker thread in the same way, and advance() swaps them in
+    at the next frame once they are ready. Results whose maze version is no longer current are dropped.
+
+    The fields are built by the `engine`, a plain BFS by default, see WavefrontEngine for the vectorized one.
+
+    The last player fields are kept in an LRU cache keyed by the player cell, up to PLAYER_CACHE_BYTES, so that
+    pacing back and forth in the same rooms takes no BFS at all. A cache hit is swapped in immediately in every mode.
+    The incremental mode repairs a copy of the distances, as the cached ones must not change.
+
+    Fleeing characters use the safety map of the player field (see safety_distances), which is built by one more
+    pass over the floor wherever the field is built: by the time-sliced BFS or the worker thread in those modes,
+    so it never stalls a frame there. It is cached and swapped in together with the field, and its steps are
+    filled in lazily like the flow fields.
+
+    Registered nodes with a region of interest are only notified when some step in the region may have changed,
+    see step_changes, so idle mobs far from the player cost nothing as it walks around. The flee steps are not
+    tracked, as a change anywhere may move the safety map.
+
+    Point-to-point queries use Jump Point Search, or the hierarchical RoomGraph on floors split into rooms, guided by
+    the landmark heuristic (see Landmarks) on floors that carry landmark fields.
+
+    Floors with a precomputed distance matrix use the DistanceTable for both the fields and the point-to-point
+    queries, in all the modes, as a row lookup is cheaper than any of them.
+    """
+
     notify = directNotify.newCategory("CharacterPathfinding")
 
-    def __init__(self, player: SupportsGetCellPos):
-        self.distances: list[list[int | None]] = []
-        self.__handlers: dict[ManagedNode, Callable[[Self], None]] = {}
+    INCREMENTAL_BUDGET: float = 1 / 8
+    # How many cells the time-sliced BFS expands between the budget checks
+    SLICE_CHUNK: int = 256
+    # Memory cap of the target field cache
+    FIELD_CACHE_BYTES: int = 64 * 1024 * 1024
+    # Memory cap of the cache of the player fields
+    PLAYER_CACHE_BYTES: int = 32 * 1024 * 1024
+
+    def __init__(
+        self,
+        player: SupportsGetCellPos,
+        incremental: bool = False,
+        time_slice_us: int | None = None,
+        background: bool = False,
+        engine: FieldEngine = bfs_engine,
+    ):
+        if background and time_slice_us is not None:
+            raise ValueError("background and time-sliced modes are exclusive")
+        if engine is not bfs_engine and time_slice_us is not None:
+            raise ValueError("the time-sliced mode only works with the BFS engine")
+        self.distances: DistanceField = new_distance_field(0)
+        self.toward: FlowField = new_flow_field(0)
+        self.away: FlowField = new_flow_field(0)
+        self.flee: FlowField = new_flow_field(0)
+        self.safety: DistanceField = array("i")
+        self.incremental = incremental
+        self.time_slice_us = time_slice_us
+        self.background = background
+        self.engine = engine
+        # Fields toward targets other than the player
+        self.field_cache = DistanceFieldCache(self.FIELD_CACHE_BYTES)
+        # Recent fields of the player, by the player cell
+        self.player_cache = DistanceFieldCache(self.PLAYER_CACHE_BYTES)
+        self.__handlers: dict[ManagedNode, tuple[Callable[[Self], None], RegionOfInterest | None]] = {}
+        # The maze and the distances the handlers were last notified of
+        self.__notified: tuple[MazeData | None, DistanceField] | None = None
         self.__player = player
+        # The maze and the player cell the distances were computed for
+        self.__maze: MazeData | None = None
+        self.__source: CellId | None = None
+        self.__subscribed = False
+        self.__pending: _PendingField | _BackgroundField | None = None
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__room_graph: RoomGraph | None = None
+        self.__landmarks: Landmarks | None = None
+        self.__distance_table: DistanceTable | None = None
 
     @override
     def run(self):
-        self.__player.run_on_cell_change(self.update_distances)
-        self.distances = self.__get_distances(self.__player)
+        if not self.__subscribed:
+            self.__subscribed = True
+            self.__player.run_on_cell_change(lambda _player: self.request_update())
+        self.__update_field(self.__player)
 
     @override
-    def register(self, node: ManagedNode, callback: Callable[[Self], None]):
-        self.__handlers[node] = callback
+    def update(self):
+        self.update_distances(self.__player)
+
+    @override
+    def advance(self):
+        pending = self.__pending
+        if isinstance(pending, _BackgroundField):
+            if pending.future.done():
+                self.__pending = None
+                self.__swap_in(pending.maze, pending.future.result())
+            return
+        if pending is None or self.time_slice_us is None:
+            return
+        if pending.maze is not DependencyInjector.get(MazeData):
+            # The floor changed before the build was done
+            self.__pending = None
+            return
+        deadline = time.perf_counter_ns() + self.time_slice_us * 1000
+        try:
+            # Always make some progress, even if the budget is too small
+            next(pending.steps)
+            while time.perf_counter_ns() < deadline:
+                next(pending.steps)
+        except StopIteration as done:
+            self.__pending = None
+            fields, safety = done.value
+            self.__install(pending.maze, pending.source, fields, safety)
+            self.__notify_handlers()
+
+    @override
+    def close(self):
+        self.__drop_pending()
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    def __swap_in(self, maze: MazeData, field: TaggedField):
+        if field.version != DependencyInjector.get(MazeData).version:
+            return
+        self.__install(maze, field.source, (field.distances, field.toward, field.away), field.safety)
+        self.__notify_handlers()
+
+    def __install(self, maze: MazeData, source: CellId, fields: Fields, safety: DistanceField):
+        """Makes the fields built for the player at `source` and their safety map current and caches them."""
+        self.__set_fields(fields, safety)
+        self.__maze = maze
+        self.__source = source
+        self.player_cache.put(TargetField(maze, frozenset([source]), fields, safety))
+
+    def __set_fields(self, fields: Fields, safety: DistanceField):
+        self.distances, self.toward, self.away = fields
+        self.safety = safety
+        self.flee = new_flow_field(len(safety), UNKNOWN_STEP)
+
+    def __drop_pending(self):
+        if isinstance(self.__pending, _BackgroundField):
+            self.__pending.future.cancel()
+        self.__pending = None
+
+    def __submit(self, maze: MazeData, source: CellId):
+        pending = self.__pending
+        if isinstance(pending, _BackgroundField) and pending.source == source:
+            return
+        self.__drop_pending()
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pathfinding")
+        future = self.__executor.submit(TaggedField.build, self.engine, maze, source)
+        self.__pending = _BackgroundField(maze, source, future)
+
+    @override
+    def register(self, node: ManagedNode, callback: Callable[[Self], None], region: RegionOfInterest | None = None):
+        is_new = node not in self.__handlers
+        self.__handlers[node] = (callback, region)
+        if not is_new:
+            return
         ref = weakref.ref(self)
 
         def remove_handler(node1: ManagedNode):
             if self1 := ref():
-                self1.__handlers.pop(node1)
+                self1.__handlers.pop(node1, None)
 
         node.run_before_destruction(remove_handler)
 
     def update_distances(self, player: SupportsGetCellPos):
-        self.distances = self.__get_distances(player)
-        for h in self.__handlers.values():
-            h(self)
+        if self.__update_field(player):
+            self.__notify_handlers()
+
+    def __notify_handlers(self):
+        maze, notified = self.__maze, self.__notified
+        self.__notified = (maze, self.distances)
+        # Computed on the first handler with a region, everything changes on a new floor
+        changes = None
+        for callback, region in self.__handlers.values():
+            if region is not None and maze is not None and notified is not None and notified[0] is maze:
+                if changes is None:
+                    changes = step_changes(maze, notified[1], self.distances)
+                x0, y0, x1, y1 = region.bounds()
+                if not changes[max(y0, 0) : max(y1, 0), max(x0, 0) : max(x1, 0)].any():
+                    continue
+            callback(self)
 
     @override
     def get_distance(self, x: int, y: int):
-        return self.distances[y][x]
+        if self.__maze is None or not self.__maze.in_bounds(x, y):
+            return None
+        dist = self.distances[self.__maze.cell_id(x, y)]
+        return dist if dist >= 0 else None
 
     @override
     def get_distances_to_adjacent(self, x: int, y: int):
         maze = DependencyInjector.get(MazeData)
-        options = maze.get_adjacent(x, y)
-        distances = [(self.get_distance(x1, y1), (x1, y1)) for x1, y1 in options]
-        return [(d, p) for d, p in distances if d is not None]
+        out: list[tuple[int, tuple[int, int]]] = []
+        if maze is not self.__maze or not maze.in_bounds(x, y):
+            return out
+        for cell in maze.adjacency.neighbours(maze.cell_id(x, y)):
+            if (dist := self.distances[cell]) >= 0:
+                out.append((dist, maze.cell_pos(cell)))
+        return out
+
+    @override
+    def get_step_toward(self, x: int, y: int):
+        if self.__maze is None or not self.__maze.in_bounds(x, y):
+            return None
+        step = self.step_toward(self.__maze.cell_id(x, y))
+        return None if step == NO_STEP else self.__maze.cell_pos(step)
+
+    @override
+    def get_step_away(self, x: int, y: int):
+        if self.__maze is None or not self.__maze.in_bounds(x, y):
+            return None
+        step = self.step_away(self.__maze.cell_id(x, y))
+        return None if step == NO_STEP else self.__maze.cell_pos(step)
+
+    @override
+    def get_step_flee(self, x: int, y: int):
+        if self.__maze is None or not self.__maze.in_bounds(x, y):
+            return None
+        step = self.step_flee(self.__maze.cell_id(x, y))
+        return None if step == NO_STEP else self.__maze.cell_pos(step)
+
+    @override
+    def cache_info(self):
+        return {"player": self.player_cache.info(), "targets": self.field_cache.info()}
+
+    @override
+    def get_target_field(self, targets: Iterable[tuple[int, int]]):
+        maze = DependencyInjector.get(MazeData)
+        return self.field_cache.get(maze, [maze.cell_id(x, y) for x, y in targets if maze.in_bounds(x, y)])
 
-    def __get_distances(self, player: SupportsGetCellPos) -> list[list[int | None]]:
+    @override
+    def find_path(self, start: tuple[int, int], goal: tuple[int, int]):
+        maze = DependencyInjector.get(MazeData)
+        if (table := self.__table(maze)) is not None:
+            return table.find_path(start, goal)
+        heuristic = self.__heuristic(maze)
+        if maze.regions is None:
+            return jump_point_search(maze, start, goal, heuristic)
+        if self.__room_graph is None or self.__room_graph.maze is not maze:
+            self.__room_graph = RoomGraph(maze, heuristic=heuristic)
+        return self.__room_graph.find_path(start, goal)
+
+    def __heuristic(self, maze: MazeData) -> Heuristic | None:
+        if maze.landmark_fields is None:
+            return None
+        if self.__landmarks is None or self.__landmarks.maze is not maze:
+            self.__landmarks = Landmarks(maze)
+        return self.__landmarks.heuristic
+
+    def __table(self, maze: MazeData) -> DistanceTable | None:
+        if maze.distance_matrix is None:
+            return None
+        if self.__distance_table is None or self.__distance_table.maze is not maze:
+            self.__distance_table = DistanceTable(maze)
+        return self.__distance_table
+
+    def step_toward(self, cell: CellId) -> CellId:
+        """Cell id based version of get_step_toward, returns NO_STEP if there is no step."""
+        step = self.toward[cell]
+        if step == UNKNOWN_STEP and self.__maze is not None:
+            step = self.toward[cell] = flow_step(self.distances, self.__maze.adjacency, cell, -1)
+        return step
+
+    def step_away(self, cell: CellId) -> CellId:
+        """Cell id based version of get_step_away, returns NO_STEP if there is no step."""
+        step = self.away[cell]
+        if step == UNKNOWN_STEP and self.__maze is not None:
+            step = self.away[cell] = flow_step(self.distances, self.__maze.adjacency, cell, 1)
+        return step
+
+    def step_flee(self, cell: CellId) -> CellId:
+        """Cell id based version of get_step_flee, returns NO_STEP if there is no step."""
+        step = self.flee[cell]
+        if step == UNKNOWN_STEP and self.__maze is not None:
+            step = self.flee[cell] = downhill_step(self.safety, self.__maze.adjacency, cell)
+        return step
+
+    def __update_field(self, player: SupportsGetCellPos) -> bool:
+        """Returns whether the fields have changed."""
         maze = DependencyInjector.get(MazeData)
-        out: list[list[int | None]] = [[None for _ in row] for row in maze.cells]
         x, y = player.get_cell_pos()
-        if x < 0 or y < 0 or x >= maze.width or y >= maze.height:
+        if not maze.in_bounds(x, y):
             self.notify.warning(f"Player is not inside the maze: size {maze.width}x{maze.height} position ({x},{y})!")
-            return out
-        queue = deque([(x, y, 0)])
-        while queue:
-            x, y, dist = queue.popleft()
-            if out[y][x] is not None:
-                continue
-            out[y][x] = dist
-            for x1, y1 in maze.get_adjacent(x, y):
-                queue.append((x1, y1, dist + 1))
-        return out
+            size = maze.width * maze.height
+            self.__set_fields(
+                (new_distance_field(size), new_flow_field(size), new_flow_field(size)), array("i", [0]) * size
+            )
+            self.__maze = maze
+            self.__source = None
+            self.__drop_pending()
+            return True
+
+        source = maze.cell_id(x, y)
+        if maze is self.__maze and source == self.__source:
+            self.__drop_pending()
+            return False
+        if maze is not self.__maze:
+            # Fields of the floors that are gone are never hit again
+            self.player_cache.clear()
+        cached = self.player_cache.lookup(maze, [source])
+        fields = None if cached is None else (cached.distances, cached.toward, cached.away)
+        safety = None if cached is None else cached.safety
+        table = self.__table(maze)
+        if fields is None and maze is self.__maze and self.__source is not None and table is None:
+            if self.background:
+                self.__submit(maze, source)
+                return False
+            if self.time_slice_us is not None:
+                pending = self.__pending
+                if pending is None or pending.source != source:
+                    steps = _iter_player_fields(maze.adjacency, source, self.SLICE_CHUNK)
+                    self.__pending = _PendingField(maze, source, steps)
+                return False
+            if self.incremental:
+                fields = self.__repair(maze, self.__source, source)
+        if fields is None:
+            fields = (self.engine if table is None else table)(maze, [source])
+        if safety is None:
+            safety = safety_distances(fields[0], maze.adjacency)
+        self.__drop_pending()
+        self.__install(maze, source, fields, safety)
+        return True
+
+    def __repair(self, maze: MazeData, old: CellId, new: CellId) -> Fields | None:
+        """The fields of the player moved from `old` to `new` repaired from the current ones, if it pays off."""
+        if new not in maze.adjacency.neighbours(old):
+            return None
+        # The current distances may be cached, so the repair runs on a copy
+        distances = self.distances[:]
+        budget = int(len(distances) * self.INCREMENTAL_BUDGET)
+        if move_source(distances, maze.adjacency, old, new, budget) is None:
+            return None
+        # The steps are filled in lazily after a repair
+        return distances, new_flow_field(len(distances), UNKNOWN_STEP), new_flow_field(len(distances), UNKNOWN_STEP)
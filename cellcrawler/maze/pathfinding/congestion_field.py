@@ -0,0 +1,200 @@
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import final
+
+import numpy as np
+import numpy.typing as npt
+
+from cellcrawler.maze.adjacency_index import AdjacencyIndex, CellId
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.distance_field import NO_STEP, UNREACHABLE, DistanceField
+
+# Cost of stepping into every cell, indexed by cell id, an int32 array. Costs are positive integers.
+type CostField = array[int]
+# Cells grouped by their tentative distance, the bucket queue of Dial's algorithm
+type Buckets = defaultdict[int, list[CellId]]
+
+
+def weighted_distances(adjacency: AdjacencyIndex, costs: CostField, sources: Iterable[CellId]) -> DistanceField:
+    """
+    Dijkstra from all the sources at once, where a step into a cell costs `costs[cell]`. The distance of a cell
+    is the cost of walking from it to the closest source: the cell itself is not paid for, the source is.
+    Since the costs are small integers, the queue is an array of buckets, one per distance, which is swept once.
+    """
+    field = array("i", [UNREACHABLE]) * len(adjacency)
+    buckets: Buckets = defaultdict(list)
+    for cell in sources:
+        field[cell] = 0
+        buckets[0].append(cell)
+    _settle(field, adjacency, costs, buckets)
+    return field
+
+
+def _settle(field: DistanceField, adjacency: AdjacencyIndex, costs: CostField, buckets: Buckets) -> int:
+    """Runs the bucket queue until it is empty, returns the number of improved distances."""
+    improved = 0
+    dist = min(buckets, default=0)
+    while buckets:
+        for cell in buckets.pop(dist, ()):
+            if field[cell] != dist:
+                continue
+            # Walking from a neighbour toward the sources through `cell` means stepping into it
+            reach = dist + costs[cell]
+            for other in adjacency.neighbours(cell):
+                current = field[other]
+                if current < 0 or current > reach:
+                    field[other] = reach
+                    buckets[reach].append(other)
+                    improved += 1
+        dist += 1
+    return improved
+
+
+def repair_costs(
+    field: DistanceField,
+    adjacency: AdjacencyIndex,
+    costs: CostField,
+    changes: dict[CellId, int],
+    budget: int | None = None,
+) -> int | None:
+    """
+    Sets new costs of stepping into some cells and repairs the field in place, in the manner of LPA*.
+
+    The best distance a cell can get from its neighbours is its `rhs`. The cells around the changed ones whose
+    distance doesn't match their `rhs` are fixed in the order of distance, through the same bucket queue:
+    a cell whose `rhs` got lower takes it and passes it on, a cell whose `rhs` got higher is reset and queued again.
+    Only the cells whose distance really changes and their neighbours are visited: when a character steps from one
+    cell to the next, the paths through both of them keep their length and are not touched at all.
+
+    Returns the number of fixed cells. If more than `budget` cells would have to be fixed, the repair stops
+    early, leaves the field in an inconsistent state and returns None. The caller should then rebuild the field.
+    """
+
+    def rhs(cell: CellId) -> int:
+        # The sources are the only cells at distance 0, as the costs are positive
+        if field[cell] == 0:
+            return 0
+        best = UNREACHABLE
+        for parent in adjacency.neighbours(cell):
+            if (dist := field[parent]) >= 0 and (best < 0 or dist + costs[parent] < best):
+                best = dist + costs[parent]
+        return best
+
+    buckets: Buckets = defaultdict(list)
+
+    def push(cell: CellId):
+        dist, best = field[cell], rhs(cell)
+        if dist != best:
+            buckets[best if dist < 0 or 0 <= best < dist else dist].append(cell)
+
+    for cell, cost in changes.items():
+        costs[cell] = cost
+    for cell in changes:
+        for other in adjacency.neighbours(cell):
+            push(other)
+
+    fixed = 0
+    dist = min(buckets, default=0)
+    while buckets:
+        # A cell fixed at this distance can queue a neighbour at the same distance again, so the bucket is drained
+        # until it stays empty. The entries that went stale since they were queued are dropped.
+        while cells := buckets.pop(dist, None):
+            for cell in cells:
+                current, best = field[cell], rhs(cell)
+                if current == best or dist != (best if current < 0 or 0 <= best < current else current):
+                    continue
+                fixed += 1
+                if budget is not None and fixed > budget:
+                    return None
+                if current < 0 or 0 <= best < current:
+                    field[cell] = best
+                else:
+                    field[cell] = UNREACHABLE
+                    push(cell)
+                for other in adjacency.neighbours(cell):
+                    push(other)
+        dist += 1
+    return fixed
+
+
+@final
+class CongestionField:
+    """
+    Weighted distance field toward the closest of a set of target cells, where stepping into a cell costs
+    `terrain[cell] + congestion_cost * occupancy[cell]`, so that characters walk around crowds instead of queueing
+    behind each other. The terrain costs default to 1 everywhere. The targets themselves always cost 1.
+
+    The field follows MazeData.occupancy: `refresh` finds the cells whose occupancy changed since the last call
+    and only repairs the part of the field around them. If the repair would fix more than REPAIR_BUDGET
+    of the floor, the field is rebuilt instead.
+    """
+
+    CONGESTION_COST = 4
+    REPAIR_BUDGET: float = 1 / 64
+
+    def __init__(
+        self,
+        maze: MazeData,
+        targets: Iterable[CellId],
+        congestion_cost: int = CONGESTION_COST,
+        terrain: npt.NDArray[np.int32] | None = None,
+    ):
+        if terrain is not None and terrain.shape != maze.walkable.shape:
+            raise ValueError("terrain costs must have the shape of the maze")
+        self.maze = maze
+        self.targets = frozenset(targets)
+        self.congestion_cost = congestion_cost
+        self.__terrain: npt.NDArray[np.int32] = (
+            np.ones(maze.width * maze.height, dtype=np.int32)
+            if terrain is None
+            else terrain.reshape(-1).astype(np.int32)
+        )
+        self.__occupancy = maze.occupancy.copy()
+        costs = self.__terrain + congestion_cost * self.__occupancy.reshape(-1)
+        costs[list(self.targets)] = 1
+        self.costs: CostField = array("i", costs.astype(np.int32).tobytes())
+        self.distances: DistanceField = weighted_distances(maze.adjacency, self.costs, self.targets)
+
+    def refresh(self) -> int:
+        """Repairs the field after occupancy changes, returns the number of updated distances."""
+        occupancy = self.maze.occupancy
+        changed: list[CellId] = np.flatnonzero(occupancy != self.__occupancy).tolist()
+        if not changed:
+            return 0
+        np.copyto(self.__occupancy, occupancy)
+        costs: list[int] = (self.__terrain[changed] + self.congestion_cost * occupancy.reshape(-1)[changed]).tolist()
+        changes = dict(zip(changed, costs, strict=True))
+        for cell in self.targets:
+            changes.pop(cell, None)
+        budget = int(len(self.distances) * self.REPAIR_BUDGET)
+        updated = repair_costs(self.distances, self.maze.adjacency, self.costs, changes, budget)
+        if updated is not None:
+            return updated
+        for cell, cost in changes.items():
+            self.costs[cell] = cost
+        self.distances = weighted_distances(self.maze.adjacency, self.costs, self.targets)
+        return len(self.distances)
+
+    def get_distance(self, x: int, y: int) -> int | None:
+        if not self.maze.in_bounds(x, y):
+            return None
+        dist = self.distances[self.maze.cell_id(x, y)]
+        return dist if dist >= 0 else None
+
+    def get_step_toward(self, x: int, y: int) -> tuple[int, int] | None:
+        if not self.maze.in_bounds(x, y):
+            return None
+        step = self.step_toward(self.maze.cell_id(x, y))
+        return None if step == NO_STEP else self.maze.cell_pos(step)
+
+    def step_toward(self, cell: CellId) -> CellId:
+        """The neighbour a cheapest path to the targets goes through, NO_STEP if there is none."""
+        distances, costs = self.distances, self.costs
+        dist = distances[cell]
+        if dist <= 0:
+            return NO_STEP
+        for other in self.maze.adjacency.neighbours(cell):
+            if (other_dist := distances[other]) >= 0 and other_dist + costs[other] == dist:
+                return other
+        return NO_STEP
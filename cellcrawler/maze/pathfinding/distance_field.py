@@ -0,0 +1,317 @@
+from array import array
+from collections import defaultdict
+from collections.abc import Generator, Iterable
+
+from cellcrawler.maze.adjacency_index import AdjacencyIndex, CellId
+
+# Distances to the closest source, indexed by cell id. The fields are int16 arrays,
+# which are only widened to int32 when some distance doesn't fit.
+type DistanceField = array[int]
+# The next cell to step to from every cell, indexed by cell id, an int32 array.
+type FlowField = array[int]
+
+# Distance field value of unreachable cells.
+UNREACHABLE = -1
+# Flow field value of cells that have nowhere to go.
+NO_STEP: CellId = -1
+# Flow field value of cells whose step was not computed yet, see `flow_step`.
+UNKNOWN_STEP: CellId = -2
+
+_MAX_DISTANCE = {"h": 2**15 - 1, "i": 2**31 - 1}
+
+# A safety map starts at the distance times -FLEE_SCALE, and no cell is more than FLEE_STEP above a neighbour,
+# the 1.2 ratio of Brogue's safety maps
+FLEE_SCALE = 6
+FLEE_STEP = 5
+
+
+def new_distance_field(size: int) -> DistanceField:
+    """A field of `size` unreachable cells."""
+    return array("h", [UNREACHABLE]) * size
+
+
+def new_flow_field(size: int, step: CellId = NO_STEP) -> FlowField:
+    return array("i", [step]) * size
+
+
+def _fit(field: DistanceField, dist: int) -> DistanceField:
+    """The field itself if `dist` fits into it, otherwise a widened copy."""
+    if dist <= _MAX_DISTANCE[field.typecode]:
+        return field
+    return array("i", field)
+
+
+def bfs_distances(adjacency: AdjacencyIndex, sources: Iterable[CellId]) -> DistanceField:
+    """Level-by-level BFS from all the sources at once."""
+    out = new_distance_field(len(adjacency))
+    frontier: list[CellId] = []
+    for cell in sources:
+        if out[cell] < 0:
+            out[cell] = 0
+            frontier.append(cell)
+    dist = 0
+    while frontier:
+        dist += 1
+        out = _fit(out, dist)
+        next_frontier: list[CellId] = []
+        for cell in frontier:
+            for other in adjacency.neighbours(cell):
+                if out[other] < 0:
+                    out[other] = dist
+                    next_frontier.append(other)
+        frontier = next_frontier
+    return out
+
+
+def bfs_with_flow(adjacency: AdjacencyIndex, sources: Iterable[CellId]) -> tuple[DistanceField, FlowField, FlowField]:
+    """
+    Same as `bfs_distances`, but also builds the flow fields toward the sources and away from them in the same pass.
+    A step toward the sources decreases the distance by one, a step away from them increases it by one.
+    """
+    steps = iter_bfs_with_flow(adjacency, sources, len(adjacency))
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def iter_bfs_with_flow(
+    adjacency: AdjacencyIndex, sources: Iterable[CellId], chunk: int
+) -> Generator[None, None, tuple[DistanceField, FlowField, FlowField]]:
+    """
+    Resumable version of `bfs_with_flow`: yields after every `chunk` expanded cells and returns the fields.
+    The fields are not shared with anything until the generator is done, so it can be paused between frames.
+    """
+    out = new_distance_field(len(adjacency))
+    toward = new_flow_field(len(adjacency))
+    away = new_flow_field(len(adjacency))
+    frontier: list[CellId] = []
+    for cell in sources:
+        if out[cell] < 0:
+            out[cell] = 0
+            frontier.append(cell)
+    dist = 0
+    expanded = 0
+    while frontier:
+        dist += 1
+        out = _fit(out, dist)
+        next_frontier: list[CellId] = []
+        for cell in frontier:
+            step = NO_STEP
+            for other in adjacency.neighbours(cell):
+                other_dist = out[other]
+                if other_dist < 0:
+                    out[other] = dist
+                    toward[other] = cell
+                    next_frontier.append(other)
+                    step = other
+                elif other_dist == dist:
+                    step = other
+            if step != NO_STEP:
+                away[cell] = step
+            expanded += 1
+            if expanded == chunk:
+                expanded = 0
+                yield
+        frontier = next_frontier
+    return out, toward, away
+
+
+def flow_step(field: DistanceField, adjacency: AdjacencyIndex, cell: CellId, delta: int) -> CellId:
+    """Computes a single flow field value: the neighbour whose distance differs from the cell's by `delta`."""
+    dist = field[cell]
+    if dist < 0:
+        return NO_STEP
+    for other in adjacency.neighbours(cell):
+        if field[other] == dist + delta:
+            return other
+    return NO_STEP
+
+
+def safety_distances(field: DistanceField, adjacency: AdjacencyIndex) -> DistanceField:
+    """
+    Safety map of a distance field, in the manner of Brogue's inverted Dijkstra maps: every reachable cell starts
+    at its distance times -FLEE_SCALE, then the values are relaxed so that no cell is more than FLEE_STEP above
+    its neighbours. Rolling downhill on the map leads away from the sources, and out of a dead end when the open
+    floor behind the sources is much further than the end of it, where a plain step away gets stuck.
+    Unreachable cells are left at 0. Runs a single bucket queue sweep over the floor.
+    """
+    steps = iter_safety_distances(field, adjacency, len(field))
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def iter_safety_distances(
+    field: DistanceField, adjacency: AdjacencyIndex, chunk: int
+) -> Generator[None, None, DistanceField]:
+    """Resumable version of `safety_distances`: yields after every `chunk` visited cells and returns the map."""
+    safety = array("i", [0]) * len(field)
+    buckets: defaultdict[int, list[CellId]] = defaultdict(list)
+    visited = 0
+    for cell, dist in enumerate(field):
+        if dist >= 0:
+            safety[cell] = -FLEE_SCALE * dist
+            buckets[-FLEE_SCALE * dist].append(cell)
+        visited += 1
+        if visited == chunk:
+            visited = 0
+            yield
+    value = min(buckets, default=0)
+    while buckets:
+        reach = value + FLEE_STEP
+        for cell in buckets.pop(value, ()):
+            if safety[cell] != value:
+                continue
+            for other in adjacency.neighbours(cell):
+                if safety[other] > reach:
+                    safety[other] = reach
+                    buckets[reach].append(other)
+            visited += 1
+            if visited == chunk:
+                visited = 0
+                yield
+        value += 1
+    return safety
+
+
+def downhill_step(safety: DistanceField, adjacency: AdjacencyIndex, cell: CellId) -> CellId:
+    """The neighbour with the lowest value of a safety map, NO_STEP if none is lower than the cell itself."""
+    best, step = safety[cell], NO_STEP
+    for other in adjacency.neighbours(cell):
+        if safety[other] < best:
+            best, step = safety[other], other
+    return step
+
+
+def move_source(
+    field: DistanceField, adjacency: AdjacencyIndex, old: CellId, new: CellId, budget: int | None = None
+) -> int | None:
+    """
+    Repairs in place a field computed from the single source `old` so that it becomes rooted at `new`,
+    which must be adjacent to `old`. Only the cells whose distance changes (and their neighbours) are visited.
+    Returns the number of cells whose distance changed.
+
+    If more than `budget` cells would change, or a distance would not fit into the field, the repair stops early,
+    leaves the field in an inconsistent state and returns None. The caller should then rebuild the field from scratch.
+
+    The repair runs in two steps: first `new` is added as a second source, which can only decrease distances,
+    then `old` stops being a source, which can only increase them.
+    """
+    added = add_source(field, adjacency, new, budget)
+    if added is None:
+        return None
+    removed = remove_source(field, adjacency, old, None if budget is None else budget - added)
+    if removed is None:
+        return None
+    return added + removed
+
+
+def add_source(field: DistanceField, adjacency: AdjacencyIndex, source: CellId, budget: int | None = None):
+    """Floods from the new source for as long as the distances improve. See `move_source` for `budget`."""
+    if field[source] == 0:
+        return 0
+    field[source] = 0
+    changed = 1
+    frontier = [source]
+    dist = 0
+    limit = _MAX_DISTANCE[field.typecode]
+    while frontier:
+        dist += 1
+        if dist > limit:
+            return None
+        next_frontier: list[CellId] = []
+        for cell in frontier:
+            for other in adjacency.neighbours(cell):
+                current = field[other]
+                if current < 0 or current > dist:
+                    field[other] = dist
+                    next_frontier.append(other)
+        changed += len(next_frontier)
+        if budget is not None and changed > budget:
+            return None
+        frontier = next_frontier
+    return changed
+
+
+def remove_source(field: DistanceField, adjacency: AdjacencyIndex, source: CellId, budget: int | None = None):
+    """
+    Stops `source` from being a source of the field. See `move_source` for `budget`.
+    A cell has to be recomputed iff every neighbour one step closer to the sources has to be recomputed too.
+    """
+    affected = _find_affected(field, adjacency, source, budget)
+    if affected is None:
+        return None
+
+    # Recompute the affected cells, starting from the unaffected cells around them, in the order of distance.
+    for cell in affected:
+        field[cell] = UNREACHABLE
+    limit = _MAX_DISTANCE[field.typecode]
+    buckets = _boundary_buckets(field, adjacency, affected)
+    if max(buckets, default=0) > limit:
+        return None
+    for dist, cells in buckets.items():
+        for cell in cells:
+            field[cell] = dist
+    dist = min(buckets, default=0)
+    while buckets:
+        if dist >= limit:
+            return None
+        for cell in buckets.pop(dist, []):
+            if field[cell] != dist:
+                continue
+            for other in adjacency.neighbours(cell):
+                current = field[other]
+                if other in affected and (current < 0 or current > dist + 1):
+                    field[other] = dist + 1
+                    buckets[dist + 1].append(other)
+        dist += 1
+    return len(affected)
+
+
+def _boundary_buckets(
+    field: DistanceField, adjacency: AdjacencyIndex, affected: set[CellId]
+) -> defaultdict[int, list[CellId]]:
+    """The affected cells next to unaffected ones, grouped by the distance they get through them."""
+    buckets: defaultdict[int, list[CellId]] = defaultdict(list)
+    for cell in affected:
+        best = -1
+        for other in adjacency.neighbours(cell):
+            if (dist := field[other]) >= 0 and (best < 0 or dist + 1 < best):
+                best = dist + 1
+        if best >= 0:
+            buckets[best].append(cell)
+    return buckets
+
+
+def _find_affected(
+    field: DistanceField, adjacency: AdjacencyIndex, source: CellId, budget: int | None
+) -> set[CellId] | None:
+    """The cells that lost all of their shortest paths when `source` stopped being a source."""
+    queue = [source]
+    affected = {source}
+    parents_left: dict[CellId, int] = {}
+    i = 0
+    while i < len(queue):
+        cell = queue[i]
+        i += 1
+        dist = field[cell]
+        for child in adjacency.neighbours(cell):
+            if field[child] != dist + 1 or child in affected:
+                continue
+            left = parents_left.get(child)
+            if left is None:
+                left = sum(1 for parent in adjacency.neighbours(child) if field[parent] == dist)
+            left -= 1
+            if left:
+                parents_left[child] = left
+            else:
+                parents_left.pop(child, None)
+                affected.add(child)
+                queue.append(child)
+                if budget is not None and len(affected) > budget:
+                    return None
+    return affected
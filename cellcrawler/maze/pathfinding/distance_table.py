@@ -0,0 +1,113 @@
+import hashlib
+import os
+from array import array
+from collections.abc import Iterable
+from contextlib import suppress
+from typing import final
+
+import numpy as np
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import DistanceMatrix, MazeData
+from cellcrawler.maze.pathfinding.distance_field import DistanceField, FlowField, bfs_distances
+from cellcrawler.maze.pathfinding.point_search import PathResult, compact_waypoints
+from cellcrawler.maze.pathfinding.wavefront import flow_fields, neighbour_table
+
+# Distance matrix value of the pairs of cells that are not connected
+NOT_CONNECTED = np.iinfo(np.uint16).max
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def all_pairs_distances(maze: MazeData) -> DistanceMatrix:
+    """Runs a BFS from every walkable cell, the matrix takes 2 bytes per pair of walkable cells."""
+    cells = np.flatnonzero(maze.walkable)
+    matrix = np.empty((len(cells), len(cells)), dtype=np.uint16)
+    for row, cell in enumerate(cells.tolist()):
+        field = bfs_distances(maze.adjacency, [cell])
+        dist = np.frombuffer(field, dtype=np.int16 if field.typecode == "h" else np.int32)[cells]
+        matrix[row] = np.where(dist < 0, NOT_CONNECTED, dist.astype(np.int32))
+    return matrix
+
+
+def table_path(map_path: str, maze: MazeData) -> str:
+    """Where the distance matrix of the maze loaded from `map_path` is stored, next to the map itself."""
+    digest = hashlib.blake2b(maze.grid.tobytes() + repr(maze.grid.shape).encode(), digest_size=8).hexdigest()
+    return f"{map_path}.{digest}.dist.npy"
+
+
+def load_distance_matrix(maze: MazeData, map_path: str) -> DistanceMatrix:
+    """
+    Maps the distance matrix of the maze stored next to the map into memory, or builds and stores it.
+    The file name has a digest of the layout, so that editing the map doesn't pick up a stale matrix.
+    A matrix that can't be stored is still returned.
+    """
+    path = table_path(map_path, maze)
+    cells = int(np.count_nonzero(maze.walkable))
+    with suppress(OSError, ValueError):
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape == (cells, cells) and matrix.dtype == np.uint16:
+            return matrix
+    matrix = all_pairs_distances(maze)
+    # Written to a temporary file first, so that a half-written matrix is never mapped
+    with suppress(OSError):
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, matrix)
+        os.replace(path + ".tmp", path)
+    return matrix
+
+
+@final
+class DistanceTable:
+    """
+    Precomputed distances between every two cells of a small fixed floor, see MazeData.distance_matrix.
+    Any-to-any distances take a single lookup, and the player fields are a row of the matrix plus the flow fields,
+    with no BFS at all.
+    """
+
+    def __init__(self, maze: MazeData):
+        if maze.distance_matrix is None:
+            raise ValueError("the maze has no distance matrix")
+        self.maze = maze
+        self.matrix: DistanceMatrix = maze.distance_matrix
+        self.cells = np.flatnonzero(maze.walkable)
+        index = np.full(maze.width * maze.height, -1, dtype=np.int32)
+        index[self.cells] = np.arange(len(self.cells), dtype=np.int32)
+        # Row of the matrix of every cell, -1 for walls
+        self.__index: list[int] = index.tolist()
+        self.__table = neighbour_table(maze)
+
+    def distance(self, start: CellId, goal: CellId) -> int | None:
+        row, column = self.__index[start], self.__index[goal]
+        if row < 0 or column < 0:
+            return None
+        dist = int(self.matrix[row, column])
+        return None if dist == NOT_CONNECTED else dist
+
+    def __call__(self, maze: MazeData, sources: Iterable[CellId]) -> tuple[DistanceField, FlowField, FlowField]:
+        """A field engine, see CharacterPathfinding."""
+        rows = [row for cell in sources if (row := self.__index[cell]) >= 0]
+        dist = np.full(len(self.__index), -1, dtype=np.int32)
+        if rows:
+            closest = self.matrix[rows].min(axis=0).astype(np.int32)
+            dist[self.cells] = np.where(closest == NOT_CONNECTED, -1, closest)
+        toward, away = flow_fields(self.__table, dist)
+        typecode, dtype = ("h", np.int16) if dist.max(initial=0) <= _INT16_MAX else ("i", np.int32)
+        return array(typecode, dist.astype(dtype).tobytes()), toward, away
+
+    def find_path(self, start: tuple[int, int], goal: tuple[int, int]) -> PathResult:
+        """Walks down the distances to the goal, one lookup per neighbour of every cell of the path."""
+        maze = self.maze
+        if not maze.is_walkable(*start) or not maze.is_walkable(*goal):
+            return PathResult(None, None, 0)
+        cell, target = maze.cell_id(*start), maze.cell_id(*goal)
+        length = self.distance(cell, target)
+        if length is None:
+            return PathResult(None, None, 0)
+        column = self.matrix[:, self.__index[target]]
+        index = self.__index
+        path = [cell]
+        for dist in range(length - 1, -1, -1):
+            cell = next(other for other in maze.adjacency.neighbours(cell) if column[index[other]] == dist)
+            path.append(cell)
+        return PathResult(compact_waypoints(map(maze.cell_pos, path)), length, 0)
@@ -0,0 +1,135 @@
+import dataclasses
+import sys
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import final
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.distance_field import NO_STEP, DistanceField, FlowField, bfs_with_flow
+
+type FieldKey = tuple[frozenset[CellId], int]
+# The distance field and the flow fields toward and away from its sources
+type Fields = tuple[DistanceField, FlowField, FlowField]
+
+
+@final
+class TargetField:
+    """Distance and flow fields toward the closest of a set of target cells, built with a BFS unless given."""
+
+    def __init__(
+        self,
+        maze: MazeData,
+        targets: frozenset[CellId],
+        fields: Fields | None = None,
+        safety: DistanceField | None = None,
+    ):
+        self.targets = targets
+        self.version = maze.version
+        self.width = maze.width
+        self.height = maze.height
+        self.distances, self.toward, self.away = bfs_with_flow(maze.adjacency, targets) if fields is None else fields
+        # The safety map of the distances, if it was built along with them, see safety_distances
+        self.safety = safety
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the fields."""
+        return sum(sys.getsizeof(f) for f in (self.distances, self.toward, self.away, self.safety) if f is not None)
+
+    def get_distance(self, x: int, y: int) -> int | None:
+        if not (0 <= x < self.width) or not (0 <= y < self.height):
+            return None
+        dist = self.distances[y * self.width + x]
+        return dist if dist >= 0 else None
+
+    def get_step_toward(self, x: int, y: int) -> tuple[int, int] | None:
+        return self.__step(self.toward, x, y)
+
+    def get_step_away(self, x: int, y: int) -> tuple[int, int] | None:
+        return self.__step(self.away, x, y)
+
+    def __step(self, flow: FlowField, x: int, y: int) -> tuple[int, int] | None:
+        if not (0 <= x < self.width) or not (0 <= y < self.height):
+            return None
+        step = flow[y * self.width + x]
+        if step == NO_STEP:
+            return None
+        y1, x1 = divmod(step, self.width)
+        return x1, y1
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheInfo:
+    """A snapshot of the state of a DistanceFieldCache."""
+
+    stats: CacheStats
+    fields: int
+    nbytes: int
+    max_bytes: int
+
+
+@final
+class DistanceFieldCache:
+    """
+    LRU cache of target fields keyed by (target set, maze version), so that repeated queries toward the same
+    targets share a single BFS. The least recently used fields are evicted once the cache takes more than
+    `max_bytes`. A field that doesn't fit on its own is returned, but not kept.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.stats = CacheStats()
+        self.__fields: OrderedDict[FieldKey, TargetField] = OrderedDict()
+
+    def __len__(self):
+        return len(self.__fields)
+
+    def get(self, maze: MazeData, targets: Iterable[CellId]) -> TargetField:
+        targets = frozenset(targets)
+        if (field := self.lookup(maze, targets)) is not None:
+            return field
+        return self.put(TargetField(maze, targets))
+
+    def lookup(self, maze: MazeData, targets: Iterable[CellId]) -> TargetField | None:
+        """The cached field toward the targets, counted as a hit or a miss."""
+        key = (frozenset(targets), maze.version)
+        if (field := self.__fields.get(key)) is not None:
+            self.stats.hits += 1
+            self.__fields.move_to_end(key)
+            return field
+        self.stats.misses += 1
+        return None
+
+    def put(self, field: TargetField) -> TargetField:
+        """Caches a field built elsewhere, replacing the field with the same key."""
+        key = (field.targets, field.version)
+        if (replaced := self.__fields.pop(key, None)) is not None:
+            self.nbytes -= replaced.nbytes
+        self.__fields[key] = field
+        self.nbytes += field.nbytes
+        while self.nbytes > self.max_bytes and self.__fields:
+            _, evicted = self.__fields.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.stats.evictions += 1
+        return field
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(dataclasses.replace(self.stats), len(self.__fields), self.nbytes, self.max_bytes)
+
+    def clear(self):
+        self.__fields.clear()
+        self.nbytes = 0
@@ -0,0 +1,68 @@
+from array import array
+from typing import final
+
+import numpy as np
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import LandmarkFields, MazeData
+from cellcrawler.maze.pathfinding.distance_field import bfs_distances
+from cellcrawler.maze.pathfinding.point_search import manhattan
+
+
+def landmark_fields(maze: MazeData, count: int) -> LandmarkFields:
+    """
+    BFS fields from `count` landmarks picked by farthest-point selection: every next landmark is the cell furthest
+    from the ones picked before (and the cells unreachable from all of them go first), so the landmarks end up
+    in the far corners and dead ends of the floor, behind most of the paths, where the bounds are the tightest.
+    """
+    fields = np.empty((count, maze.grid.size), dtype=np.int32)
+    cells = np.flatnonzero(maze.walkable)
+    if not len(cells):
+        return fields[:0]
+    # Distance from every walkable cell to its closest landmark, walls are never picked
+    closest = np.where(maze.walkable.reshape(-1), np.iinfo(np.int32).max, -1)
+    landmark = int(np.argmax(_bfs(maze, int(cells[0]))))
+    for row in range(count):
+        field = fields[row] = _bfs(maze, landmark)
+        closest = np.where(field >= 0, np.minimum(closest, field), closest)
+        landmark = int(np.argmax(closest))
+    return fields
+
+
+def _bfs(maze: MazeData, source: CellId):
+    field = bfs_distances(maze.adjacency, [source])
+    return np.frombuffer(field, dtype=np.int16 if field.typecode == "h" else np.int32).astype(np.int32)
+
+
+@final
+class Landmarks:
+    """
+    ALT (A*, landmarks, triangle inequality) heuristic over the landmark fields of a maze. For a landmark L,
+    |d(L, goal) - d(L, cell)| never exceeds d(cell, goal), and the best of these bounds is much tighter than
+    the Manhattan distance in twisty mazes, where the shortest paths are nowhere near straight lines.
+    """
+
+    def __init__(self, maze: MazeData):
+        if maze.landmark_fields is None:
+            raise ValueError("the maze has no landmark fields")
+        self.maze = maze
+        # Array rows, as indexing numpy arrays from Python is a lot slower
+        self.__rows = [array("i", row.tobytes()) for row in maze.landmark_fields]
+        self.__manhattan = manhattan(maze)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(row.itemsize * len(row) for row in self.__rows)
+
+    def heuristic(self, cell: CellId, goal: CellId) -> int:
+        best = self.__manhattan(cell, goal)
+        for row in self.__rows:
+            to_cell, to_goal = row[cell], row[goal]
+            # Landmarks in other parts of a disconnected floor bound nothing
+            if to_cell >= 0 and to_goal >= 0:
+                bound = to_cell - to_goal if to_cell > to_goal else to_goal - to_cell
+                best = max(best, bound)
+        return best
@@ -1,13 +1,46 @@
 import abc
-from collections.abc import Callable
-from typing import Self
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Protocol, Self
 
 from cellcrawler.lib.managed_node import ManagedNode
+from cellcrawler.maze.pathfinding.field_cache import CacheInfo, TargetField
+from cellcrawler.maze.pathfinding.pathfinding_scheduler import PathfindingScheduler
+from cellcrawler.maze.pathfinding.point_search import PathResult
+
+
+class HasCellPos(Protocol):
+    def get_cell_pos(self) -> tuple[int, int]: ...
+
+
+@dataclass(frozen=True)
+class RegionOfInterest:
+    """
+    The cells at most `radius` away along both axes from the `center`, which is either a fixed cell
+    or a character whose current cell is taken at every update.
+    """
+
+    center: tuple[int, int] | HasCellPos
+    radius: int = 0
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """The left, top, right and bottom bounds of the region, the last two exclusive, maybe out of the maze."""
+        x, y = self.center if isinstance(self.center, tuple) else self.center.get_cell_pos()
+        return x - self.radius, y - self.radius, x + self.radius + 1, y + self.radius + 1
 
 
 class PathfindingService(abc.ABC):
+    # If set, update requests are coalesced by the scheduler instead of running immediately
+    scheduler: PathfindingScheduler | None = None
+
     @abc.abstractmethod
-    def register(self, node: ManagedNode, callback: Callable[[Self], None]) -> None: ...
+    def register(
+        self, node: ManagedNode, callback: Callable[[Self], None], region: RegionOfInterest | None = None
+    ) -> None:
+        """
+        Calls `callback` after the fields change, until the node is destroyed. With a `region`, only when the steps
+        in it may have changed, otherwise after every change.
+        """
 
     @abc.abstractmethod
     def get_distance(self, x: int, y: int) -> int | None: ...
@@ -16,4 +49,48 @@ class PathfindingService(abc.ABC):
     def get_distances_to_adjacent(self, x: int, y: int) -> list[tuple[int, tuple[int, int]]]: ...
 
     @abc.abstractmethod
-    def run(self) -> None: ...
+    def get_step_toward(self, x: int, y: int) -> tuple[int, int] | None:
+        """The adjacent cell one step closer to the target, None if there is none."""
+
+    @abc.abstractmethod
+    def get_step_away(self, x: int, y: int) -> tuple[int, int] | None:
+        """The adjacent cell one step further from the target, None if there is none."""
+
+    @abc.abstractmethod
+    def get_step_flee(self, x: int, y: int) -> tuple[int, int] | None:
+        """
+        The adjacent cell a character fleeing from the target should step to, None if it is safest where it is.
+        Unlike get_step_away, leads out of dead ends when there is more room to run on the other side.
+        """
+
+    @abc.abstractmethod
+    def get_target_field(self, targets: Iterable[tuple[int, int]]) -> TargetField:
+        """Distance and flow fields toward the closest of the given cells, shared between all callers."""
+
+    @abc.abstractmethod
+    def find_path(self, start: tuple[int, int], goal: tuple[int, int]) -> PathResult:
+        """A shortest path between two arbitrary cells, independent of the tracked target."""
+
+    @abc.abstractmethod
+    def run(self) -> None:
+        """Starts tracking the target (only once, however many times it is called) and computes the fields."""
+
+    @abc.abstractmethod
+    def update(self) -> None:
+        """Recomputes the fields and notifies the registered nodes."""
+
+    def cache_info(self) -> dict[str, CacheInfo]:
+        """Hit rates and memory taken by the field caches of the service, by cache name."""
+        return {}
+
+    def advance(self) -> None:
+        """Continues time-sliced work, if the service has any. Called once per frame."""
+
+    def close(self) -> None:
+        """Releases the resources of the service, such as its worker threads."""
+
+    def request_update(self):
+        if self.scheduler:
+            self.scheduler.request()
+        else:
+            self.update()
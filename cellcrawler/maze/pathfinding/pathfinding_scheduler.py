@@ -0,0 +1,40 @@
+import dataclasses
+from collections.abc import Callable
+from typing import final
+
+
+@dataclasses.dataclass
+class SchedulerStats:
+    # Calls to request()
+    requested: int = 0
+    # Requests that were merged into an already pending recompute
+    coalesced: int = 0
+    # Recomputes that actually ran
+    executed: int = 0
+
+
+@final
+class PathfindingScheduler:
+    """
+    Coalesces recompute requests of a pathfinding service with a dirty flag.
+    Any number of requests between two flushes result in a single recompute, and the owner is expected
+    to call flush() once per frame, so at most one recompute runs per frame.
+    """
+
+    def __init__(self, recompute: Callable[[], None]):
+        self.__recompute = recompute
+        self.dirty = False
+        self.stats = SchedulerStats()
+
+    def request(self):
+        self.stats.requested += 1
+        if self.dirty:
+            self.stats.coalesced += 1
+        self.dirty = True
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.stats.executed += 1
+        self.__recompute()
@@ -0,0 +1,180 @@
+import dataclasses
+import heapq
+from collections.abc import Callable, Iterable
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import MazeData
+
+# Lower bound of the distance between two cells, must never overestimate it
+type Heuristic = Callable[[CellId, CellId], int]
+type Successors = Callable[[CellId, CellId], Iterable[tuple[CellId, int]]]
+
+
+@dataclasses.dataclass
+class PathResult:
+    # The start, the cells the path turns at and the goal. None if the goal is unreachable
+    waypoints: list[tuple[int, int]] | None
+    length: int | None
+    # How many nodes the search has expanded
+    expanded: int
+
+    def cells(self) -> list[tuple[int, int]] | None:
+        """Every cell of the path, from the start to the goal inclusive."""
+        if self.waypoints is None:
+            return None
+        out = self.waypoints[:1]
+        for (x1, y1), (x2, y2) in zip(self.waypoints, self.waypoints[1:], strict=False):
+            dx, dy = _sign(x2 - x1), _sign(y2 - y1)
+            x, y = x1, y1
+            while (x, y) != (x2, y2):
+                x, y = x + dx, y + dy
+                out.append((x, y))
+        return out
+
+
+def _sign(v: int) -> int:
+    return (v > 0) - (v < 0)
+
+
+def manhattan(maze: MazeData) -> Heuristic:
+    width = maze.width
+
+    def heuristic(cell: CellId, goal: CellId) -> int:
+        y1, x1 = divmod(cell, width)
+        y2, x2 = divmod(goal, width)
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    return heuristic
+
+
+def graph_search(
+    start: CellId, goal: CellId, successors: Successors, heuristic: Heuristic
+) -> tuple[list[CellId] | None, int | None, int]:
+    """A* over an arbitrary successor function, returns the visited nodes of the path, its length and expansions."""
+    cost = {start: 0}
+    parent = {start: start}
+    # Ties are broken toward the deeper nodes, which are closer to the goal
+    queue = [(heuristic(start, goal), 0, start)]
+    expanded = 0
+    while queue:
+        _, neg_cost, cell = heapq.heappop(queue)
+        if -neg_cost > cost[cell]:
+            continue
+        if cell == goal:
+            path = [cell]
+            while cell != start:
+                cell = parent[cell]
+                path.append(cell)
+            path.reverse()
+            return path, -neg_cost, expanded
+        expanded += 1
+        for other, step_cost in successors(cell, parent[cell]):
+            new_cost = step_cost - neg_cost
+            if new_cost < cost.get(other, new_cost + 1):
+                cost[other] = new_cost
+                parent[other] = cell
+                heapq.heappush(queue, (new_cost + heuristic(other, goal), -new_cost, other))
+    return None, None, expanded
+
+
+def astar(
+    maze: MazeData, start: tuple[int, int], goal: tuple[int, int], heuristic: Heuristic | None = None
+) -> PathResult:
+    """Plain A* over the adjacency index, expanding cells one by one."""
+    if not maze.is_walkable(*start) or not maze.is_walkable(*goal):
+        return PathResult(None, None, 0)
+    adjacency = maze.adjacency
+
+    def successors(cell: CellId, _parent: CellId):
+        return ((other, 1) for other in adjacency.neighbours(cell))
+
+    path, length, expanded = graph_search(
+        maze.cell_id(*start), maze.cell_id(*goal), successors, heuristic or manhattan(maze)
+    )
+    return PathResult(None if path is None else compact_waypoints(map(maze.cell_pos, path)), length, expanded)
+
+
+def jump_point_search(
+    maze: MazeData, start: tuple[int, int], goal: tuple[int, int], heuristic: Heuristic | None = None
+) -> PathResult:
+    """
+    A* with Jump Point Search for the 4-connected grid. Instead of expanding every cell, the search runs along
+    straight lines and only stops at the cells where an optimal path may have to turn: the cells with a forced
+    neighbour, and the cells of vertical runs that have a jump point to the side. Paths run horizontally first.
+    """
+    if not maze.is_walkable(*start) or not maze.is_walkable(*goal):
+        return PathResult(None, None, 0)
+    width, height = maze.width, maze.height
+    walkable = maze.walkable_flat
+    gx, gy = goal
+
+    def walk(x: int, y: int) -> bool:
+        return 0 <= x < width and 0 <= y < height and walkable[y * width + x] != 0
+
+    def jump_horizontal(x: int, y: int, dx: int) -> tuple[int, int] | None:
+        # Scans the rows with bytes.find, which is a lot faster than stepping through the cells one by one
+        row = y * width
+        sides = [side for side in (row - width, row + width) if 0 <= side < width * height]
+        if dx > 0:
+            wall = walkable.find(b"\0", row + x + 1, row + width)
+            # The open cells to the right are [row + x + 1, end)
+            end = row + width if wall < 0 else wall
+            best = min(end, row + gx) if gy == y and gx > x else end
+            for side in sides:
+                # A forced neighbour: an open cell to the side right after a wall
+                if (i := walkable.find(b"\0\1", side + x, side + end - row)) >= 0:
+                    best = min(best, row + i + 1 - side)
+            return None if best == end else (best - row, y)
+        wall = walkable.rfind(b"\0", row, row + x)
+        # The open cells to the left are [begin, row + x)
+        begin = row if wall < 0 else wall + 1
+        best = max(begin - 1, row + gx) if gy == y and gx < x else begin - 1
+        for side in sides:
+            if (i := walkable.rfind(b"\1\0", side + begin - row, side + x + 1)) >= 0:
+                best = max(best, row + i - side)
+        return None if best < begin else (best - row, y)
+
+    def jump_vertical(x: int, y: int, dy: int) -> tuple[int, int] | None:
+        while True:
+            y += dy
+            if not walk(x, y):
+                return None
+            if (x == gx and y == gy) or (
+                (walk(x - 1, y) and not walk(x - 1, y - dy)) or (walk(x + 1, y) and not walk(x + 1, y - dy))
+            ):
+                return x, y
+            if jump_horizontal(x, y, 1) or jump_horizontal(x, y, -1):
+                return x, y
+
+    def successors(cell: CellId, parent: CellId):
+        y, x = divmod(cell, width)
+        if cell == parent:
+            directions = ((-1, 0), (1, 0), (0, -1), (0, 1))
+        else:
+            py, px = divmod(parent, width)
+            dx, dy = _sign(x - px), _sign(y - py)
+            directions = ((0, -1), (0, 1), (dx, 0)) if dx else ((-1, 0), (1, 0), (0, dy))
+        for dx, dy in directions:
+            point = jump_horizontal(x, y, dx) if dx else jump_vertical(x, y, dy)
+            if point is not None:
+                yield point[1] * width + point[0], abs(point[0] - x) + abs(point[1] - y)
+
+    path, length, expanded = graph_search(
+        maze.cell_id(*start), maze.cell_id(*goal), successors, heuristic or manhattan(maze)
+    )
+    return PathResult(None if path is None else compact_waypoints(map(maze.cell_pos, path)), length, expanded)
+
+
+def compact_waypoints(points: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Drops the points in the middle of straight segments, and repeated points."""
+    out: list[tuple[int, int]] = []
+    for pos in points:
+        if out and out[-1] == pos:
+            continue
+        if len(out) >= 2:  # noqa: PLR2004
+            (x0, y0), (x1, y1) = out[-2], out[-1]
+            if (x0 == x1 == pos[0]) or (y0 == y1 == pos[1]):
+                out[-1] = pos
+                continue
+        out.append(pos)
+    return out
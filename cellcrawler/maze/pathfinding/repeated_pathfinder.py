@@ -5,14 +5,26 @@ from direct.task.Task import Task, TaskManager
 from cellcrawler.lib.base import inject_globals
 from cellcrawler.lib.managed_node import ManagedNode
 from cellcrawler.maze.pathfinding.pathfinding import PathfindingService
+from cellcrawler.maze.pathfinding.pathfinding_scheduler import PathfindingScheduler
 
 
 @final
 class RepeatedPathfinder(ManagedNode):
+    """
+    Drives a pathfinding service: requests an update every `period` seconds, and once per frame,
+    after the characters have moved, flushes the coalesced update requests and advances time-sliced work.
+    """
+
+    # Character command tasks run with the default sort of 0
+    FLUSH_TASK_SORT = 1
+
     def __init__(self, parent: "ManagedNode | None", pathfinder: PathfindingService, period: float) -> None:
         super().__init__(parent)
         self.pathfinder = pathfinder
+        self.scheduler = PathfindingScheduler(pathfinder.update)
+        pathfinder.scheduler = self.scheduler
         self.task = None
+        self.flush_task = None
         self.period: Final = period
 
     @inject_globals
@@ -21,14 +33,26 @@ class RepeatedPathfinder(ManagedNode):
             raise RuntimeError("Attempt to start RepeatedPathfinder twice")
         self.pathfinder.run()
         self.task = task_mgr.do_method_later(self.period, self.run, f"pathfinding-{id(self)}")
+        self.flush_task = task_mgr.add(self.flush, f"pathfinding-flush-{id(self)}", sort=self.FLUSH_TASK_SORT)
 
     def run(self, task: Task):
-        self.pathfinder.run()
+        self.pathfinder.request_update()
         return task.again
 
+    def flush(self, task: Task):
+        self.scheduler.flush()
+        self.pathfinder.advance()
+        return task.cont
+
     @override
     @inject_globals
     def _cleanup(self, task_mgr: TaskManager) -> None:
         if self.task:
             task_mgr.remove(self.task)
             self.task = None
+        if self.flush_task:
+            task_mgr.remove(self.flush_task)
+            self.flush_task = None
+        if self.pathfinder.scheduler is self.scheduler:
+            self.pathfinder.scheduler = None
+        self.pathfinder.close()
@@ -0,0 +1,137 @@
+from collections.abc import Iterator
+from typing import final
+
+import numpy as np
+import numpy.typing as npt
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.point_search import (
+    Heuristic,
+    PathResult,
+    compact_waypoints,
+    graph_search,
+    jump_point_search,
+    manhattan,
+)
+
+
+@final
+class RoomGraph:
+    """
+    HPA*-style abstract graph of a floor that is split into regions (rooms and corridors) joined by doorways.
+
+    The nodes are the doorway cells, and the doorways of the same region are joined by the length of the shortest
+    path through that region. A query links the start and the goal to the doorways of their regions, searches
+    this small graph, and only then refines every leg with a local search, so its cost grows with the number of
+    rooms on the way rather than with the number of cells.
+
+    Regions of more than `cluster_size`**2 cells (the corridors of a big floor are usually one region that touches
+    every room) are further split into square clusters, and their cells on the cluster borders become doorways.
+    The borders lie on even coordinates, where the generated corridors only have single-cell crossings.
+
+    Both searches use the given `heuristic`, the Manhattan distance by default.
+    """
+
+    CLUSTER_SIZE = 32
+
+    def __init__(self, maze: MazeData, cluster_size: int = CLUSTER_SIZE, heuristic: Heuristic | None = None):
+        if maze.regions is None:
+            raise ValueError("the maze is not split into regions")
+        self.maze = maze
+        self.version = maze.version
+        labels = self.__split_regions(maze.regions, cluster_size).reshape(-1)
+        self.__labels: list[int] = labels.tolist()
+        doors = maze.walkable.reshape(-1) & (labels < 0)
+        self.doors: list[CellId] = np.flatnonzero(doors).tolist()
+        self.edges: dict[CellId, list[tuple[CellId, int]]] = {
+            door: self.__reachable_doors(door)[0] for door in self.doors
+        }
+        self.__heuristic = manhattan(maze) if heuristic is None else heuristic
+
+    @staticmethod
+    def __split_regions(regions: npt.NDArray[np.int32], size: int) -> npt.NDArray[np.int64]:
+        labels = regions.astype(np.int64)
+        in_region = labels >= 0
+        counts = np.bincount(labels[in_region])
+        big = np.zeros(labels.shape, dtype=np.bool_)
+        big[in_region] = counts[labels[in_region]] > size * size
+        if not big.any():
+            return labels
+        ys, xs = np.indices(labels.shape)
+        blocks_x = -(-labels.shape[1] // size)
+        blocks = blocks_x * -(-labels.shape[0] // size)
+        cluster = len(counts) + labels * blocks + (ys // size) * blocks_x + xs // size
+        labels = np.where(big, cluster, labels)
+        labels[big & ((xs % size == 0) | (ys % size == 0))] = -1
+        return labels
+
+    def route(self, start: CellId, goal: CellId) -> tuple[list[CellId] | None, int | None, int]:
+        """The doorways a shortest path goes through, with the start and the goal, its length and expansions."""
+        start_edges, direct = self.__reachable_doors(start, goal)
+        into_goal = dict(self.__reachable_doors(goal)[0])
+        edges = self.edges
+
+        def successors(node: CellId, _parent: CellId) -> Iterator[tuple[CellId, int]]:
+            if node == start:
+                yield from start_edges
+                if direct is not None:
+                    yield goal, direct
+            else:
+                yield from edges.get(node, ())
+            if (dist := into_goal.get(node)) is not None:
+                yield goal, dist
+
+        return graph_search(start, goal, successors, self.__heuristic)
+
+    def find_path(self, start: tuple[int, int], goal: tuple[int, int]) -> PathResult:
+        maze = self.maze
+        if not maze.is_walkable(*start) or not maze.is_walkable(*goal):
+            return PathResult(None, None, 0)
+        nodes, length, expanded = self.route(maze.cell_id(*start), maze.cell_id(*goal))
+        if nodes is None:
+            return PathResult(None, None, expanded)
+        points = [start]
+        for node, next_node in zip(nodes, nodes[1:], strict=False):
+            leg = jump_point_search(maze, maze.cell_pos(node), maze.cell_pos(next_node), self.__heuristic)
+            expanded += leg.expanded
+            points.extend(leg.waypoints or ())
+        return PathResult(compact_waypoints(points), length, expanded)
+
+    def __reachable_doors(
+        self, cell: CellId, goal: CellId | None = None
+    ) -> tuple[list[tuple[CellId, int]], int | None]:
+        """
+        BFS from the cell through its region (or the regions around it, if it is a doorway) that stops at doorways.
+        Returns the doorways found with their distances, and the distance to the goal if it was found.
+        """
+        labels = self.__labels
+        adjacency = self.maze.adjacency
+        if labels[cell] >= 0:
+            regions = {labels[cell]}
+        else:
+            regions = {labels[other] for other in adjacency.neighbours(cell)}
+        doors: list[tuple[CellId, int]] = []
+        goal_dist = 0 if cell == goal else None
+        seen = {cell}
+        frontier = [cell]
+        dist = 0
+        while frontier:
+            dist += 1
+            next_frontier: list[CellId] = []
+            for current in frontier:
+                for other in adjacency.neighbours(current):
+                    if other in seen:
+                        continue
+                    label = labels[other]
+                    if label < 0:
+                        doors.append((other, dist))
+                    elif label in regions:
+                        next_frontier.append(other)
+                    else:
+                        continue
+                    seen.add(other)
+                    if other == goal:
+                        goal_dist = dist
+            frontier = next_frontier
+        return doors, goal_dist
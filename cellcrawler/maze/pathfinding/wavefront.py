@@ -0,0 +1,124 @@
+from array import array
+from collections.abc import Iterable
+from typing import final
+
+import numpy as np
+import numpy.typing as npt
+
+from cellcrawler.maze.adjacency_index import CellId
+from cellcrawler.maze.maze_data import MazeData
+from cellcrawler.maze.pathfinding.distance_field import NO_STEP, UNREACHABLE, DistanceField, FlowField
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def neighbour_table(maze: MazeData) -> npt.NDArray[np.int32]:
+    """
+    The (cells, 4) table of walkable neighbours to the left, right, top and bottom of every walkable cell.
+    Missing neighbours point to the extra cell id `width * height`.
+    """
+    size = maze.width * maze.height
+    walkable = maze.walkable.reshape(-1)
+    ids = np.arange(size, dtype=np.int32)
+    x = ids % maze.width
+    table = np.full((size, 4), size, dtype=np.int32)
+    directions = (
+        (-1, x > 0),
+        (1, x < maze.width - 1),
+        (-maze.width, ids >= maze.width),
+        (maze.width, ids < size - maze.width),
+    )
+    for column, (delta, inside) in enumerate(directions):
+        can_move = inside & walkable
+        can_move[can_move] = walkable[ids[can_move] + delta]
+        table[can_move, column] = ids[can_move] + delta
+    return table
+
+
+def step_changes(maze: MazeData, old: DistanceField, new: DistanceField) -> npt.NDArray[np.bool_]:
+    """
+    The (height, width) mask of the cells whose steps toward or away from the sources may differ between
+    the two fields: the cells that became reachable or unreachable, and the cells whose distance changed by
+    another amount than that of a neighbour. A step of the player shifts the distances of whole parts of the floor
+    by the same amount, which changes none of the steps there.
+    """
+    old_dist, new_dist = _as_grid(maze, old), _as_grid(maze, new)
+    reachable = (old_dist >= 0) & (new_dist >= 0)
+    changes = (old_dist >= 0) != (new_dist >= 0)
+    delta = new_dist - old_dist
+    # Neighbours along the rows, then along the columns
+    for a, b in ((np.s_[:, :-1], np.s_[:, 1:]), (np.s_[:-1, :], np.s_[1:, :])):
+        kink = reachable[a] & reachable[b] & (delta[a] != delta[b])
+        changes[a] |= kink
+        changes[b] |= kink
+    return changes
+
+
+def _as_grid(maze: MazeData, field: DistanceField) -> npt.NDArray[np.int32]:
+    dtype = np.int16 if field.typecode == "h" else np.int32
+    return np.frombuffer(field, dtype=dtype).astype(np.int32).reshape(maze.height, maze.width)
+
+
+def wavefront_distances(table: npt.NDArray[np.int32], sources: Iterable[CellId]) -> npt.NDArray[np.int32]:
+    """
+    BFS that expands the whole frontier at once: gathers the neighbours of all the frontier cells, masks out
+    the visited ones and stamps the distance onto the rest. Gives exactly the distances of `bfs_distances`.
+    """
+    size = len(table)
+    # The extra cell stands for missing neighbours and counts as visited
+    dist = np.full(size + 1, UNREACHABLE, dtype=np.int32)
+    dist[size] = 0
+    frontier = np.unique(np.fromiter(sources, dtype=np.int32))
+    dist[frontier] = 0
+    level = 0
+    while frontier.size:
+        level += 1
+        reached = table[frontier].ravel()
+        reached = reached[dist[reached] < 0]
+        if reached.size > 1:
+            reached = np.unique(reached)
+        dist[reached] = level
+        frontier = reached
+    return dist[:size]
+
+
+def flow_fields(table: npt.NDArray[np.int32], dist: npt.NDArray[np.int32]) -> tuple[FlowField, FlowField]:
+    """The flow fields toward and away from the sources of a distance field, computed for all cells at once."""
+    padded = np.append(dist, -2)
+    toward = np.full(len(dist), NO_STEP, dtype=np.int32)
+    away = np.full(len(dist), NO_STEP, dtype=np.int32)
+    reachable = dist >= 0
+    for column in table.T:
+        other = padded[column]
+        np.copyto(toward, column, where=reachable & (other == dist - 1))
+        np.copyto(away, column, where=reachable & (other == dist + 1))
+    return array("i", toward.tobytes()), array("i", away.tobytes())
+
+
+@final
+class WavefrontEngine:
+    """
+    Builds the distance and flow fields with whole-array NumPy operations instead of a per-cell Python loop.
+    The per-level overhead makes it lose to the plain BFS on perfect mazes with very long corridors,
+    but it is several times faster on floors made of rooms and open areas.
+    """
+
+    def __init__(self):
+        # The neighbour table of the last maze, along with its version. Kept in a single attribute,
+        # as the engine may be called from a worker thread.
+        self.__table: tuple[int, npt.NDArray[np.int32]] | None = None
+
+    def table(self, maze: MazeData) -> npt.NDArray[np.int32]:
+        cached = self.__table
+        if cached is not None and cached[0] == maze.version:
+            return cached[1]
+        table = neighbour_table(maze)
+        self.__table = (maze.version, table)
+        return table
+
+    def __call__(self, maze: MazeData, sources: Iterable[CellId]) -> tuple[DistanceField, FlowField, FlowField]:
+        table = self.table(maze)
+        dist = wavefront_distances(table, sources)
+        toward, away = flow_fields(table, dist)
+        typecode, dtype = ("h", np.int16) if dist.max(initial=0) <= _INT16_MAX else ("i", np.int32)
+        return array(typecode, dist.astype(dtype).tobytes()), toward, away
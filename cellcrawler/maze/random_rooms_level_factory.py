@@ -1,6 +1,8 @@
 from random import choice, randint
 from typing import final, override
 
+import numpy as np
+
 from cellcrawler.maze.level_factory import LevelFactory
 from cellcrawler.maze.maze_data import MazeCell, MazeData
 
@@ -188,4 +190,5 @@ class RandomRoomsLevelFactory(LevelFactory):
         cells = self.connect_components(cells)
         cells = self.clear_dead_ends(cells)
 
-        return MazeData(cells)
+        # Rooms and corridors keep their component colors, the opened connectors are left uncolored as doorways
+        return MazeData(cells, regions=np.array(self.color_map, dtype=np.int32))
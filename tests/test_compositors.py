@@ -1,7 +1,9 @@
 from typing import ClassVar, override
 
-from cellcrawler.core.roguelike_calc_tree import GameNode, LevelTree, MobDied
-from cellcrawler.lib.calculation_tree import MathTarget
+import pytest
+
+from cellcrawler.core.roguelike_calc_tree import CharacterNode, GameNode, LevelTree, MobDied
+from cellcrawler.lib.calculation_tree import MathTarget, NodeDestroyed, ParentRemovalBinder, Trigger
 from cellcrawler.lib.managed_node import ManagedNode
 
 
@@ -27,6 +29,136 @@ def test_calctree():
     assert tree2.calculate(math_test, 10, None) == 10
 
 
+def test_math_chain():
+    level_tree = LevelTree()
+    math_test = MathTarget[list[int], None]("MathTest")
+    first = GameNode(level_tree)
+    first.add_math_target(math_test, lambda v, _u: [*v, 1], 1)
+    assert level_tree.calculate(math_test, [], None) == [1]
+    # Adding and removing callbacks rebuilds the chain
+    second = GameNode(level_tree)
+    second.add_math_target(math_test, lambda v, _u: [*v, 0], 0)
+    second.add_math_target(math_test, lambda v, _u: [*v, 2], 2)
+    assert level_tree.calculate(math_test, [], None) == [0, 1, 2]
+    first.destroy()
+    assert level_tree.calculate(math_test, [], None) == [0, 2]
+    level_tree.destroy()
+    assert level_tree.calculate(math_test, [], None) == []
+
+
+def test_subject_listeners():
+    level_tree = LevelTree()
+    hero, mob = CharacterNode(level_tree), CharacterNode(level_tree)
+    speed = MathTarget[list[str], CharacterNode]("Speed", subject=lambda character: character)
+    hit = Trigger[CharacterNode]("Hit", subject=lambda character: character)
+    amulet = GameNode(hero)
+    amulet.add_math_target(speed, lambda v, _c: [*v, "hero"], 1, subject=hero)
+    GameNode(level_tree).add_math_target(speed, lambda v, _c: [*v, "all"], 1)
+    GameNode(level_tree).add_math_target(speed, lambda v, _c: [*v, "first"], 0)
+    assert level_tree.calculate(speed, [], hero) == ["first", "all", "hero"]
+    assert level_tree.calculate(speed, [], mob) == ["first", "all"]
+
+    hits: list[CharacterNode] = []
+    amulet.accept(hit, hits.append, subject=hero)
+    level_tree.dispatch(hit, mob)
+    level_tree.dispatch(hit, hero)
+    assert hits == [hero]
+
+    amulet.destroy()
+    assert level_tree.calculate(speed, [], hero) == ["first", "all"]
+    assert hero not in level_tree.listener._mathtargets[speed].by_subject  # pyright: ignore[reportPrivateUsage]
+    with pytest.raises(ValueError):
+        GameNode(level_tree).accept(MobDied, lambda: None, subject=hero)
+
+
+def test_math_memo():
+    level_tree = LevelTree()
+    hero, mob = CharacterNode(level_tree), CharacterNode(level_tree)
+    calls: list[CharacterNode] = []
+
+    def double(v: int, character: CharacterNode):
+        calls.append(character)
+        return v * 2
+
+    health = MathTarget[int, CharacterNode]("Health", subject=lambda character: character, memoize=True)
+    GameNode(level_tree).add_math_target(health, double)
+    stats = level_tree.listener.memo_stats[health]
+    assert [level_tree.calculate(health, 10, c) for c in (hero, hero, mob, hero)] == [20, 20, 20, 20]
+    assert calls == [hero, mob]
+    assert (stats.hits, stats.misses) == (2, 2)
+    # Another initial value is another value
+    assert level_tree.calculate(health, 5, hero) == 10
+    # Adding and removing callbacks bumps the version
+    amulet = GameNode(hero)
+    amulet.add_math_target(health, lambda v, _c: v + 1, 1, subject=hero)
+    assert level_tree.calculate(health, 5, hero) == 11
+    assert level_tree.calculate(health, 5, mob) == 10
+    amulet.destroy()
+    assert level_tree.calculate(health, 5, hero) == 10
+    assert (stats.hits, stats.misses) == (2, 6)
+
+    mob.destroy()
+    assert id(mob) not in level_tree.listener._memos[health]  # pyright: ignore[reportPrivateUsage]
+
+
+def test_node_destroyed():
+    level_tree = LevelTree()
+    hero, mob = CharacterNode(level_tree), CharacterNode(level_tree)
+    effect = GameNode(mob)
+    ParentRemovalBinder(effect, hero.name)
+    destroyed: list[int] = []
+    watcher = GameNode(level_tree)
+    watcher.on_destroyed(mob.name, destroyed.append)
+    watcher.on_destroyed(effect.name, destroyed.append)
+    level_tree.accept(NodeDestroyed, destroyed.append)
+
+    GameNode(level_tree).destroy()
+    assert len(destroyed) == 1  # only the broadcast
+    destroyed.clear()
+    hero.destroy()
+    assert effect.destroyed
+    assert not mob.destroyed
+    assert destroyed == [hero.name, effect.name, effect.name, effect.name + 1]
+    destroyed.clear()
+    watcher.destroy()
+    mob.destroy()
+    assert destroyed == [watcher.name, mob.name]
+    assert not level_tree.listener._destroyed  # pyright: ignore[reportPrivateUsage]
+
+
+def test_trigger_dispatch():
+    class Blockable(Trigger[list[str]]):
+        @override
+        def is_valid(self, *params: list[str]) -> bool:
+            return "block" not in params[0]
+
+    blockable, plain = Blockable("Blockable"), Trigger[list[str]]("Plain")
+    assert blockable.validates
+    assert not plain.validates
+    level_tree = LevelTree()
+    first, second, late = GameNode(level_tree), GameNode(level_tree), GameNode(level_tree)
+    victim = GameNode(level_tree)
+    for event in (blockable, plain):
+        first.accept(event, lambda log: log.extend(["first", "block"]), 0)
+        second.accept(event, lambda log: log.append("second"), 0)
+        late.accept(event, lambda log: log.append("late"), 1)
+
+    # An invalid event skips the rest of its priority, but not the next priorities
+    log: list[str] = []
+    level_tree.dispatch(blockable, log)
+    assert log == ["first", "block", "late"]
+    log = []
+    level_tree.dispatch(plain, log)
+    assert log == ["first", "block", "second", "late"]
+
+    # A listener removed during the dispatch doesn't get it
+    victim.accept(plain, lambda log: log.append("victim"), 1)
+    second.accept(plain, lambda _log: victim.destroy(), 0)
+    log = []
+    level_tree.dispatch(plain, log)
+    assert log == ["first", "block", "late"]
+
+
 def test_managed_nodes():
     class ManagedCounter(ManagedNode):
         counter: ClassVar[int] = 0
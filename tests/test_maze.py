@@ -1,10 +1,40 @@
-from dataclasses import dataclass
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import override
 
+import numpy as np
 import pytest
 
 from cellcrawler.lib.base import DependencyInjector
+from cellcrawler.lib.managed_node import ManagedNode
+from cellcrawler.maze.level_factory import LevelFactory
 from cellcrawler.maze.maze_data import MazeCell, MazeData
+from cellcrawler.maze.pathfinding.bitset_bfs import BitsetMaze
 from cellcrawler.maze.pathfinding.character_pathfinding import CharacterPathfinding
+from cellcrawler.maze.pathfinding.congestion_field import CongestionField
+from cellcrawler.maze.pathfinding.distance_field import (
+    NO_STEP,
+    UNREACHABLE,
+    add_source,
+    bfs_distances,
+    bfs_with_flow,
+    move_source,
+    remove_source,
+    safety_distances,
+)
+from cellcrawler.maze.pathfinding.distance_table import DistanceTable, all_pairs_distances, load_distance_matrix
+from cellcrawler.maze.pathfinding.field_cache import CacheStats, DistanceFieldCache
+from cellcrawler.maze.pathfinding.landmarks import Landmarks, landmark_fields
+from cellcrawler.maze.pathfinding.pathfinding import RegionOfInterest
+from cellcrawler.maze.pathfinding.pathfinding_scheduler import PathfindingScheduler, SchedulerStats
+from cellcrawler.maze.pathfinding.point_search import astar, jump_point_search
+from cellcrawler.maze.pathfinding.room_graph import RoomGraph
+from cellcrawler.maze.pathfinding.wavefront import WavefrontEngine, step_changes
+from cellcrawler.maze.random_dfs_level_factory import RandomDfsLevelFactory
+from cellcrawler.maze.random_rooms_level_factory import RandomRoomsLevelFactory
 
 
 def test_bad_mazes():
@@ -47,17 +77,92 @@ def test_adjacency():
     assert sorted(test_maze.get_adjacent(1, 2)) == [(1, 1), (2, 2)]
 
 
-def test_pathfinding():
-    @dataclass
-    class FakePlayer:
-        pos: tuple[int, int]
+def test_adjacency_index():
+    index = test_maze.adjacency
+    assert len(index) == test_maze.width * test_maze.height
+    for y in range(test_maze.height):
+        for x in range(test_maze.width):
+            cell = test_maze.cell_id(x, y)
+            assert test_maze.cell_pos(cell) == (x, y)
+            neighbours = [test_maze.cell_pos(c) for c in index.neighbours(cell)]
+            assert neighbours == test_maze.get_adjacent(x, y)
+            assert index.degree(cell) == len(neighbours)
+
+
+def test_occupancy():
+    maze = MazeData(test_maze.grid)
+    open_count = int(maze.walkable.sum())
+    assert len(maze.free_cells) == open_count
+
+    maze.set_occupied((1, 1))
+    maze.set_occupied((1, 1))
+    assert maze.is_occupied(1, 1)
+    assert maze.occupancy[1, 1] == 2
+    assert maze.cell_id(1, 1) not in maze.free_cells
+    assert len(maze.free_cells) == open_count - 1
+
+    maze.move_occupied((1, 1), (2, 2))
+    assert maze.occupancy[1, 1] == 1
+    assert maze.cell_id(2, 2) not in maze.free_cells
+    maze.clear_occupied((1, 1))
+    assert not maze.is_occupied(1, 1)
+    assert maze.cell_id(1, 1) in maze.free_cells
+
+    # Walls are never free, and positions outside the maze are not tracked
+    maze.move_occupied(None, (0, 0))
+    maze.clear_occupied((0, 0))
+    maze.set_occupied((-5, 100))
+    assert maze.cell_id(0, 0) not in maze.free_cells
+    assert len(maze.free_cells) == open_count - 1
+
+    sample = maze.free_cells.sample(len(maze.free_cells))
+    assert sorted(sample) == sorted(maze.free_cells)
+    assert maze.cell_id(2, 2) not in sample
+    assert all(maze.walkable[y, x] for x, y in map(maze.cell_pos, sample))
+
+
+def test_array_maze():
+    maze = MazeData(test_maze.grid.copy())
+    assert maze.grid.dtype == np.uint8
+    assert (maze.width, maze.height) == (5, 7)
+    assert maze.cells == test_maze.cells
+    assert maze.walkable[1, 1]
+    assert not maze.walkable[0, 0]
+    assert maze.is_walkable(2, 3)
+    assert not maze.is_walkable(1, 3)
+    assert not maze.is_walkable(-1, 3)
+    assert sorted(maze.get_adjacent(2, 4)) == sorted(test_maze.get_adjacent(2, 4))
+
+    with pytest.raises(ValueError):
+        MazeData(np.zeros((3, 3), dtype=np.uint8))  # no such cell type
+    with pytest.raises(ValueError):
+        MazeData(np.zeros((0, 3), dtype=np.uint8))
+
+
+class FakeNode(ManagedNode):
+    @override
+    def _cleanup(self) -> None:
+        pass
 
-        def get_cell_pos(self):
-            return self.pos
 
-        def run_on_cell_change(self, _f: object):
-            pass
+@dataclass
+class FakePlayer:
+    pos: tuple[int, int]
+    callbacks: list[Callable[["FakePlayer"], None]] = field(default_factory=list)
 
+    def get_cell_pos(self):
+        return self.pos
+
+    def run_on_cell_change(self, func: Callable[["FakePlayer"], None]):
+        self.callbacks.append(func)
+
+    def move(self, pos: tuple[int, int]):
+        self.pos = pos
+        for c in self.callbacks:
+            c(self)
+
+
+def test_pathfinding():
     player = FakePlayer((1, 1))
     pathfinder = CharacterPathfinding(player)
     pathfinder.run()
@@ -66,9 +171,542 @@ def test_pathfinding():
     assert pathfinder.get_distance(1, 5) == 6
     assert pathfinder.get_distance(3, 5) == 6
 
+    assert pathfinder.get_step_toward(1, 1) is None
+    assert pathfinder.get_step_toward(2, 5) == (2, 4)
+    assert pathfinder.get_step_away(1, 1) == (1, 2)
+    assert pathfinder.get_step_away(3, 1) is None  # dead end
+
     player.pos = (2, 5)
     pathfinder.run()
     assert pathfinder.get_distance(1, 1) == 5
     assert pathfinder.get_distance(2, 5) == 0
     assert pathfinder.get_distance(1, 5) == 1
     assert pathfinder.get_distance(3, 5) == 1
+
+
+@pytest.mark.parametrize("factory", [RandomDfsLevelFactory(10), RandomRoomsLevelFactory(10, 2, 4, 40)])
+def test_incremental_pathfinding(factory: LevelFactory):
+    maze = factory._make_level()  # pyright: ignore[reportPrivateUsage]
+    DependencyInjector.set_maze(maze)
+    try:
+        player = FakePlayer(maze.cell_pos(maze.free_cells.choice()))
+        incremental = CharacterPathfinding(player, incremental=True)
+        incremental.INCREMENTAL_BUDGET = 2  # never fall back to BFS
+        full = CharacterPathfinding(player)
+        incremental.run()
+        source = maze.cell_id(*player.pos)
+        field = bfs_distances(maze.adjacency, [source])
+        for _ in range(200):
+            player.pos = random.choice(maze.get_adjacent(*player.pos))
+            incremental.update_distances(player)
+            full.update_distances(player)
+            assert incremental.distances == full.distances
+            for cell in range(len(maze.adjacency)):
+                for step, delta in ((incremental.step_toward(cell), -1), (incremental.step_away(cell), 1)):
+                    dist = full.distances[cell]
+                    if step == NO_STEP:
+                        assert dist < 0 or all(
+                            full.distances[c] != dist + delta for c in maze.adjacency.neighbours(cell)
+                        )
+                    else:
+                        assert dist >= 0 and full.distances[step] == dist + delta
+
+            new_source = maze.cell_id(*player.pos)
+            assert move_source(field, maze.adjacency, source, new_source) is not None
+            source = new_source
+            assert field == full.distances
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+
+def test_distance_field_sources():
+    adjacency = test_maze.adjacency
+    top_left, bottom = test_maze.cell_id(1, 1), test_maze.cell_id(2, 5)
+    field = bfs_distances(adjacency, [top_left])
+    assert add_source(field, adjacency, bottom) == 7
+    assert field == bfs_distances(adjacency, [top_left, bottom])
+    assert remove_source(field, adjacency, top_left) == 5
+    assert field == bfs_distances(adjacency, [bottom])
+    # Too much work, the caller has to rebuild the field
+    assert move_source(field, adjacency, bottom, test_maze.cell_id(2, 4), budget=2) is None
+
+
+def test_compact_distance_field():
+    field = bfs_distances(test_maze.adjacency, [test_maze.cell_id(1, 1)])
+    assert field.typecode == "h"
+    assert field.itemsize == 2
+    assert field[test_maze.cell_id(0, 0)] == UNREACHABLE
+    assert field[test_maze.cell_id(3, 5)] == 6
+
+    # Widened once the distances don't fit into int16
+    corridor = MazeData(np.full((1, 40000), MazeCell.OPEN.value, dtype=np.uint8))
+    field = bfs_distances(corridor.adjacency, [0])
+    assert field.typecode == "i"
+    assert field[39999] == 39999
+
+
+@pytest.mark.parametrize("factory", [RandomDfsLevelFactory(10), RandomRoomsLevelFactory(10, 2, 4, 40)])
+def test_wavefront_engine(factory: LevelFactory):
+    maze = factory._make_level()  # pyright: ignore[reportPrivateUsage]
+    engine = WavefrontEngine()
+    cells = np.flatnonzero(maze.walkable).tolist()
+    for sources in ([random.choice(cells)], random.sample(cells, 3)):
+        distances, toward, away = engine(maze, sources)
+        assert distances == bfs_distances(maze.adjacency, sources)
+        for cell, dist in enumerate(distances):
+            neighbours = list(maze.adjacency.neighbours(cell))
+            for step, delta in ((toward[cell], -1), (away[cell], 1)):
+                if step == NO_STEP:
+                    assert dist < 0 or all(distances[c] != dist + delta for c in neighbours)
+                else:
+                    assert step in neighbours
+                    assert distances[step] == dist + delta
+
+    DependencyInjector.set_maze(maze)
+    try:
+        player = FakePlayer(maze.cell_pos(cells[0]))
+        wavefront = CharacterPathfinding(player, engine=engine)
+        bfs = CharacterPathfinding(player)
+        wavefront.run()
+        bfs.run()
+        for _ in range(20):
+            player.move(random.choice(maze.get_adjacent(*player.pos)))
+            assert wavefront.distances == bfs.distances
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+
+@pytest.mark.parametrize("strip_rows", [1, 3, BitsetMaze.STRIP_ROWS])
+@pytest.mark.parametrize("factory", [RandomDfsLevelFactory(10), RandomRoomsLevelFactory(10, 2, 4, 40)])
+def test_bitset_bfs(factory: LevelFactory, strip_rows: int):
+    maze = factory._make_level()  # pyright: ignore[reportPrivateUsage]
+    bitset = BitsetMaze(maze, strip_rows)
+    cells = np.flatnonzero(maze.walkable).tolist()
+    assert bitset.unpack(bitset.pack(cells)) == cells
+
+    DependencyInjector.set_maze(maze)
+    try:
+        player = FakePlayer(maze.cell_pos(random.choice(cells)))
+        pathfinder = CharacterPathfinding(player)
+        pathfinder.run()
+        source = maze.cell_id(*player.pos)
+        assert bitset.distances([source]) == pathfinder.distances
+        reachable = sorted(cell for cell, dist in enumerate(pathfinder.distances) if dist >= 0)
+        assert bitset.unpack(bitset.reachable([source])) == reachable
+        for dist, layer in enumerate(bitset.layers([source])):
+            assert all(pathfinder.distances[cell] == dist for cell in bitset.unpack(layer))
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+    sources = random.sample(cells, 3)
+    assert bitset.distances(sources) == bfs_distances(maze.adjacency, sources)
+
+
+def test_congestion_field():
+    maze = MazeData(test_maze.grid)
+    field = CongestionField(maze, [maze.cell_id(1, 5)])
+    assert field.get_distance(3, 4) == 3
+    assert field.get_distance(1, 1) == 6
+    maze.set_occupied((2, 4))
+    assert field.refresh() > 0
+    assert field.get_distance(3, 4) == 3
+    assert field.get_step_toward(3, 4) == (3, 5)
+    assert field.get_distance(2, 3) == 3 + CongestionField.CONGESTION_COST
+    maze.move_occupied((2, 4), (2, 3))
+    field.refresh()
+    assert field.get_distance(2, 3) == 3
+    assert field.get_distance(1, 1) == 6 + CongestionField.CONGESTION_COST
+    assert field.refresh() == 0
+    assert field.get_step_toward(1, 5) is None
+    assert field.get_distance(0, 0) is None
+
+
+@pytest.mark.parametrize("budget", [CongestionField.REPAIR_BUDGET, 0])
+@pytest.mark.parametrize("factory", [RandomDfsLevelFactory(10), RandomRoomsLevelFactory(10, 2, 4, 40)])
+def test_congestion_field_repair(factory: LevelFactory, budget: float):
+    maze = factory._make_level()  # pyright: ignore[reportPrivateUsage]
+    cells = np.flatnonzero(maze.walkable).tolist()
+    terrain = np.ones(maze.walkable.shape, dtype=np.int32)
+    terrain.reshape(-1)[random.sample(cells, 20)] = 3
+    field = CongestionField(maze, random.sample(cells, 2), terrain=terrain)
+    field.REPAIR_BUDGET = budget
+    mobs = random.sample(cells, 30)
+    for mob in mobs:
+        maze.set_occupied(maze.cell_pos(mob))
+    for _ in range(10):
+        field.refresh()
+        fresh = CongestionField(maze, field.targets, terrain=terrain)
+        assert field.distances == fresh.distances
+        assert field.costs == fresh.costs
+        for i, mob in enumerate(mobs):
+            if (step := field.step_toward(mob)) >= 0:
+                assert field.distances[step] < field.distances[mob]
+                maze.move_occupied(maze.cell_pos(mob), maze.cell_pos(step))
+                mobs[i] = step
+
+
+@pytest.mark.parametrize(("size", "budget"), [(11, 1), (22, CongestionField.REPAIR_BUDGET)])
+def test_congestion_field_repair_rounds(size: int, budget: float):
+    for seed in range(20):
+        rng = random.Random(seed)
+        maze = RandomRoomsLevelFactory(size, 2, 4, 40)._make_level()  # pyright: ignore[reportPrivateUsage]
+        cells = np.flatnonzero(maze.walkable).tolist()
+        field = CongestionField(maze, rng.sample(cells, rng.randint(1, 3)))
+        field.REPAIR_BUDGET = budget
+        occupied: list[int] = []
+        for _ in range(30):
+            for _ in range(rng.randint(1, 4)):
+                if occupied and rng.random() < 0.4:
+                    maze.clear_occupied(maze.cell_pos(occupied.pop(rng.randrange(len(occupied)))))
+                else:
+                    occupied.append(cell := rng.choice(cells))
+                    maze.set_occupied(maze.cell_pos(cell))
+            field.refresh()
+            assert field.distances == CongestionField(maze, field.targets).distances
+
+
+def test_flee_steps():
+    # A long corridor with a short dead end going down from (8, 1)
+    grid = np.full((5, 32), MazeCell.WALL.value, dtype=np.uint8)
+    grid[1, 1:31] = MazeCell.OPEN.value
+    grid[2:4, 8] = MazeCell.OPEN.value
+    maze = MazeData(grid)
+    DependencyInjector.set_maze(maze)
+    try:
+        player = FakePlayer((5, 1))
+        pathfinder = CharacterPathfinding(player)
+        pathfinder.run()
+        assert pathfinder.get_step_away(8, 2) == (8, 3)
+        # Runs back out of the dead end and away along the corridor
+        assert pathfinder.get_step_flee(8, 2) == (8, 1)
+        assert pathfinder.get_step_flee(8, 1) == (9, 1)
+        assert pathfinder.get_step_flee(30, 1) is None
+        assert pathfinder.get_step_flee(0, 0) is None
+
+        pos = (8, 3)
+        for _ in range(40):
+            if (step := pathfinder.get_step_flee(*pos)) is None:
+                break
+            pos = step
+        assert pos == (30, 1)
+
+        # The safety map follows the player
+        player.move((20, 1))
+        assert pathfinder.get_step_flee(8, 1) == (7, 1)
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+
+def test_distance_table(tmp_path: Path):
+    maze = RandomRoomsLevelFactory(8, 2, 4, 30)._make_level()  # pyright: ignore[reportPrivateUsage]
+    map_path = str(tmp_path / "floor.ccw")
+    matrix = load_distance_matrix(maze, map_path)
+    assert isinstance(matrix, np.ndarray)
+    assert matrix.dtype == np.uint16
+    assert len(list(tmp_path.glob("floor.ccw.*.dist.npy"))) == 1
+    loaded = load_distance_matrix(maze, map_path)
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, matrix)
+
+    with pytest.raises(ValueError):
+        test_maze.set_distance_matrix(matrix)
+    with pytest.raises(ValueError):
+        DistanceTable(maze)
+    maze.set_distance_matrix(loaded)
+    table = DistanceTable(maze)
+    cells = np.flatnonzero(maze.walkable).tolist()
+    for _ in range(10):
+        start, goal = random.choice(cells), random.choice(cells)
+        expected = bfs_distances(maze.adjacency, [start])[goal]
+        assert table.distance(start, goal) == expected
+        path = table.find_path(maze.cell_pos(start), maze.cell_pos(goal)).cells()
+        assert path is not None
+        assert len(path) == expected + 1
+    assert table.distance(0, cells[0]) is None
+
+    DependencyInjector.set_maze(maze)
+    try:
+        player = FakePlayer(maze.cell_pos(cells[0]))
+        pathfinder = CharacterPathfinding(player, background=True)
+        pathfinder.run()
+        player.move(maze.cell_pos(cells[-1]))
+        # No background build on floors with a table
+        distances, toward, away = bfs_with_flow(maze.adjacency, [cells[-1]])
+        assert pathfinder.distances == distances
+        assert pathfinder.toward == toward
+        assert pathfinder.away == away
+        assert pathfinder.find_path(maze.cell_pos(cells[0]), maze.cell_pos(cells[-1])).length == distances[cells[0]]
+        pathfinder.close()
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+    small = MazeData(test_maze.grid)
+    assert all_pairs_distances(small)[0].tolist() == [0, 4, 1, 2, 3, 3, 5, 4, 5, 6, 5, 6]
+
+
+def test_pathfinding_scheduler():
+    player = FakePlayer((1, 1))
+    pathfinder = CharacterPathfinding(player)
+    scheduler = pathfinder.scheduler = PathfindingScheduler(pathfinder.update)
+    pathfinder.run()
+    pathfinder.run()
+    assert len(player.callbacks) == 1
+
+    for pos in [(1, 2), (2, 2), (2, 3), (2, 4)]:
+        player.move(pos)
+    assert pathfinder.get_distance(2, 4) == 4  # nothing ran yet
+    scheduler.flush()
+    scheduler.flush()
+    assert pathfinder.get_distance(2, 4) == 0
+    assert scheduler.stats == SchedulerStats(requested=4, coalesced=3, executed=1)
+
+
+def test_region_of_interest():
+    corridor = MazeData([[MazeCell.OPEN] * 12])
+    DependencyInjector.set_maze(corridor)
+    try:
+        player = FakePlayer((2, 0))
+        pathfinder = CharacterPathfinding(player)
+        mob = FakePlayer((10, 0))
+        notified: list[str] = []
+        pathfinder.register(FakeNode(None), lambda _pf: notified.append("all"))
+        pathfinder.register(FakeNode(None), lambda _pf: notified.append("near"), RegionOfInterest((3, 0)))
+        pathfinder.register(FakeNode(None), lambda _pf: notified.append("mob"), RegionOfInterest(mob))
+        pathfinder.run()
+        player.move((3, 0))
+        assert notified == ["all", "near", "mob"]  # the handlers have seen no field yet
+
+        notified.clear()
+        player.move((4, 0))
+        # Every distance changed, but the steps only around the player
+        assert notified == ["all", "near"]
+
+        notified.clear()
+        mob.pos = (5, 0)
+        player.move((5, 0))
+        assert notified == ["all", "mob"]
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+    grid = step_changes(corridor, bfs_distances(corridor.adjacency, [3]), bfs_distances(corridor.adjacency, [4]))
+    assert np.flatnonzero(grid).tolist() == [3, 4]
+
+
+def test_time_sliced_pathfinding():
+    player = FakePlayer((1, 1))
+    pathfinder = CharacterPathfinding(player, time_slice_us=0)
+    pathfinder.SLICE_CHUNK = 2
+    notified: list[int | None] = []
+    pathfinder.register(FakeNode(None), lambda pf: notified.append(pf.get_distance(2, 5)))
+    pathfinder.run()
+    assert pathfinder.get_distance(2, 5) == 5
+
+    player.move((1, 2))
+    # The old field is visible until the new one is complete
+    steps = 0
+    while not notified:
+        assert pathfinder.get_distance(2, 5) == 5
+        pathfinder.advance()
+        steps += 1
+    assert steps > 1
+    assert notified == [4]
+    assert pathfinder.get_distance(1, 1) == 1
+    # The safety map is built by the same slices
+    assert pathfinder.safety == safety_distances(pathfinder.distances, test_maze.adjacency)
+
+    # Fields built for a floor that is gone are dropped
+    player.move((2, 2))
+    pathfinder.advance()
+    DependencyInjector.set_maze(MazeData(test_maze.grid))
+    try:
+        for _ in range(100):
+            pathfinder.advance()
+        assert notified == [4]
+        assert pathfinder.get_distance(1, 1) == 1
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+
+def test_background_pathfinding():
+    player = FakePlayer((1, 1))
+    pathfinder = CharacterPathfinding(player, background=True)
+    notified: list[int | None] = []
+    pathfinder.register(FakeNode(None), lambda pf: notified.append(pf.get_distance(2, 5)))
+    pathfinder.run()
+    assert pathfinder.get_distance(2, 5) == 5
+
+    player.move((1, 2))
+    # The old field is visible until the new one is swapped in
+    deadline = time.monotonic() + 10
+    while not notified and time.monotonic() < deadline:
+        assert pathfinder.get_distance(2, 5) == 5
+        pathfinder.advance()
+    assert notified == [4]
+    assert pathfinder.get_distance(1, 1) == 1
+    assert pathfinder.safety == safety_distances(pathfinder.distances, test_maze.adjacency)
+
+    # Fields built for a floor that is gone are dropped
+    player.move((2, 2))
+    DependencyInjector.set_maze(MazeData(test_maze.grid))
+    try:
+        time.sleep(0.1)
+        pathfinder.advance()
+        assert notified == [4]
+        assert pathfinder.get_distance(1, 1) == 1
+    finally:
+        DependencyInjector.set_maze(test_maze)
+    pathfinder.close()
+
+    with pytest.raises(ValueError):
+        CharacterPathfinding(player, time_slice_us=100, background=True)
+
+
+def test_target_field_cache():
+    pathfinder = CharacterPathfinding(FakePlayer((1, 1)))
+    field = pathfinder.get_target_field([(3, 1), (1, 5)])
+    assert field.get_distance(3, 1) == 0
+    assert field.get_distance(1, 5) == 0
+    assert field.get_distance(2, 4) == 2
+    assert field.get_distance(1, 1) == 4
+    assert field.get_step_toward(1, 2) == (2, 2)
+    assert field.get_step_toward(3, 1) is None
+    assert field.get_step_away(3, 1) == (3, 2)
+
+    assert pathfinder.get_target_field([(1, 5), (3, 1)]) is field
+    assert pathfinder.field_cache.stats == CacheStats(hits=1, misses=1)
+
+    cache = DistanceFieldCache(max_bytes=field.nbytes * 2)
+    first = cache.get(test_maze, [1])
+    cache.get(test_maze, [2])
+    assert cache.get(test_maze, [1]) is first
+    cache.get(test_maze, [3])  # evicts [2]
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.get(test_maze, [1]) is first
+    cache.get(test_maze, [2])
+    assert cache.stats == CacheStats(hits=2, misses=4, evictions=2)
+    # Different mazes don't share fields
+    assert cache.get(MazeData(test_maze.grid), [1]) is not first
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_player_field_cache(incremental: bool):
+    player = FakePlayer((1, 1))
+    pathfinder = CharacterPathfinding(player, incremental=incremental)
+    pathfinder.run()
+    first = pathfinder.distances
+    expected = first.tolist()
+    for pos in [(1, 2), (2, 2), (1, 2), (1, 1), (1, 2)]:
+        player.move(pos)
+    assert pathfinder.distances is not first
+    assert first.tolist() == expected
+    assert pathfinder.get_distance(1, 1) == 1
+
+    player.move((1, 1))
+    assert pathfinder.distances is first
+    info = pathfinder.cache_info()["player"]
+    assert info.stats == CacheStats(hits=4, misses=3)
+    assert info.fields == 3
+    assert 0 < info.nbytes <= info.max_bytes
+
+    # A new floor drops the old fields
+    DependencyInjector.set_maze(MazeData(test_maze.grid))
+    try:
+        pathfinder.update()
+        assert pathfinder.cache_info()["player"].fields == 1
+    finally:
+        DependencyInjector.set_maze(test_maze)
+
+
+def test_point_search():
+    pathfinder = CharacterPathfinding(FakePlayer((1, 1)))
+    result = pathfinder.find_path((1, 1), (3, 5))
+    assert result.length == 6
+    assert result.waypoints == [(1, 1), (1, 2), (2, 2), (2, 5), (3, 5)]
+    cells = result.cells()
+    assert cells is not None
+    assert len(cells) == 7
+    assert all(test_maze.is_walkable(*cell) for cell in cells)
+
+    assert pathfinder.find_path((1, 1), (1, 1)).waypoints == [(1, 1)]
+    assert pathfinder.find_path((1, 1), (0, 0)).waypoints is None
+    assert pathfinder.find_path((1, 1), (-1, 7)).length is None
+
+
+@pytest.mark.parametrize("factory", [RandomDfsLevelFactory(15), RandomRoomsLevelFactory(15, 2, 6, 40)])
+def test_point_search_matches_bfs(factory: LevelFactory):
+    maze = factory._make_level()  # pyright: ignore[reportPrivateUsage]
+    cells = np.flatnonzero(maze.walkable).tolist()
+    for _ in range(20):
+        start, goal = random.choice(cells), random.choice(cells)
+        expected = bfs_distances(maze.adjacency, [start])[goal]
+        assert expected >= 0
+        plain = astar(maze, maze.cell_pos(start), maze.cell_pos(goal))
+        jps = jump_point_search(maze, maze.cell_pos(start), maze.cell_pos(goal))
+        assert plain.length == jps.length == expected
+        path = jps.cells()
+        assert path is not None
+        assert len(path) == expected + 1
+        assert path[0] == maze.cell_pos(start)
+        assert path[-1] == maze.cell_pos(goal)
+        assert all(maze.is_walkable(*cell) for cell in path)
+
+
+def test_landmarks():
+    maze = RandomDfsLevelFactory(15)._make_level()  # pyright: ignore[reportPrivateUsage]
+    with pytest.raises(ValueError):
+        Landmarks(maze)
+    with pytest.raises(ValueError):
+        maze.set_landmark_fields(np.zeros((2, 3), dtype=np.int32))
+    maze.set_landmark_fields(landmark_fields(maze, 4))
+    landmarks = Landmarks(maze)
+    assert len(landmarks) == 4
+    assert landmarks.nbytes == 4 * 4 * maze.width * maze.height
+
+    cells = np.flatnonzero(maze.walkable).tolist()
+    plain_expanded = alt_expanded = 0
+    for _ in range(20):
+        start, goal = random.choice(cells), random.choice(cells)
+        field = bfs_distances(maze.adjacency, [goal])
+        # Admissible: never more than the real distance
+        assert all(landmarks.heuristic(cell, goal) <= field[cell] for cell in cells)
+        plain = astar(maze, maze.cell_pos(start), maze.cell_pos(goal))
+        alt = astar(maze, maze.cell_pos(start), maze.cell_pos(goal), landmarks.heuristic)
+        jps = jump_point_search(maze, maze.cell_pos(start), maze.cell_pos(goal), landmarks.heuristic)
+        assert plain.length == alt.length == jps.length == field[start]
+        plain_expanded += plain.expanded
+        alt_expanded += alt.expanded
+    assert alt_expanded < plain_expanded
+
+    # Landmarks in other components bound nothing
+    split = MazeData([[MazeCell.OPEN, MazeCell.WALL, MazeCell.OPEN, MazeCell.OPEN]])
+    split.set_landmark_fields(landmark_fields(split, 2))
+    assert split.landmark_fields is not None
+    assert sorted(split.landmark_fields[:, 0].tolist()) == [-1, 0]
+    assert Landmarks(split).heuristic(0, 3) == 3
+
+
+@pytest.mark.parametrize("cluster_size", [4, RoomGraph.CLUSTER_SIZE])
+def test_room_graph(cluster_size: int):
+    maze = RandomRoomsLevelFactory(20, 2, 6, 60)._make_level()  # pyright: ignore[reportPrivateUsage]
+    graph = RoomGraph(maze, cluster_size)
+    assert graph.doors
+    cells = np.flatnonzero(maze.walkable).tolist()
+    for _ in range(20):
+        start, goal = random.choice(cells), random.choice(cells)
+        expected = bfs_distances(maze.adjacency, [start])[goal]
+        assert expected >= 0
+        route, length, _ = graph.route(start, goal)
+        assert route is not None
+        assert route[0] == start
+        assert route[-1] == goal
+        assert length == expected
+        path = graph.find_path(maze.cell_pos(start), maze.cell_pos(goal)).cells()
+        assert path is not None
+        assert len(path) == expected + 1
+        assert path[0] == maze.cell_pos(start)
+        assert path[-1] == maze.cell_pos(goal)
+        assert all(abs(x1 - x2) + abs(y1 - y2) == 1 for (x1, y1), (x2, y2) in zip(path, path[1:], strict=False))
+
+    with pytest.raises(ValueError):
+        RoomGraph(test_maze)